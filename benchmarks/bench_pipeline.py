@@ -0,0 +1,104 @@
+"""Benchmark the run pipeline on synthetic corpora.
+
+Reports tickets per second and per ticket latency for parsing, projection, staging, the edit
+phase and a full replayed run against an in-memory feature layer.
+
+    python benchmarks/bench_pipeline.py --sizes 100 1000 10000 --json bench.json
+"""
+import argparse
+import json
+import logging
+import tempfile
+import time
+
+from ocgis import ocgisapp
+from ocgis.attribute_maps import NEW_ATTRIBUTE_MAP
+from ocgis.extraction import TicketExtractor
+from ocgis.replay import FakeFeatureLayer, synthetic_corpus, write_corpus
+from ocgis.writer import EditWriter
+
+DISTRICTS = ['cf1', 'cf2']
+CLOSED_STATUSES = ['Clear', 'Marked']
+WKID = 102100
+# Share of the tickets that are already in the layer, and of extra open tickets outside the window.
+EXISTING_RATIO = 0.5
+OPEN_RATIO = 0.1
+
+
+def _template() -> dict:
+    return {'attributes': None, 'geometry': {'rings': None, 'spatialReference': {'wkid': WKID, 'latestWkid': 3857}}}
+
+
+def _existing_features(ticket_dictionaries: list) -> list:
+    return [{'attributes': {'ticketNumber': ticket['attributes']['ticketNumber'], 'status': 'OPEN'}, 'geometry': None} for ticket in ticket_dictionaries]
+
+
+def _timed(results: dict, stage: str, tickets: int, function):
+    start = time.perf_counter()
+    value = function()
+    seconds = time.perf_counter() - start
+    results[stage] = {
+        'tickets': tickets,
+        'seconds': seconds,
+        'tickets_per_second': tickets / seconds if seconds else float('inf'),
+        'ms_per_ticket': seconds * 1000 / tickets if tickets else 0.0,
+    }
+    return value
+
+
+def bench(size: int) -> dict:
+    tickets = synthetic_corpus(size)
+    extractor = TicketExtractor(NEW_ATTRIBUTE_MAP)
+    results = {}
+
+    parsed = _timed(results, 'parse', size, lambda: [
+        ocgisapp._content_parsing(ticket, extractor, DISTRICTS, CLOSED_STATUSES, _template(), WKID, project_geometry=False)
+        for ticket in tickets
+    ])
+    rings = _timed(results, 'projection', size, lambda: ocgisapp.convert_geometry_rings_batch([ticket['geometry']['rings'] for ticket in parsed], WKID))
+    for ticket, ticket_rings in zip(parsed, rings):
+        ticket['geometry']['rings'] = ticket_rings
+
+    layer = FakeFeatureLayer(_existing_features(parsed[:int(size * EXISTING_RATIO)]))
+    ticket_index = _timed(results, 'index', size, lambda: ocgisapp._build_ticket_index(layer))
+    adds, deletes, updates = [], [], []
+    _timed(results, 'staging', size, lambda: [ocgisapp._stage_changes(ticket, ticket_index, adds, deletes, updates, feature_class=layer.feature_class) for ticket in parsed])
+    _timed(results, 'edit', size, lambda: EditWriter(layer).write(adds=adds, updates=updates, deletes=deletes))
+
+    # Full replayed run: the print page holds `size` tickets and the layer holds extra open
+    # tickets outside of the window, which are looked up individually.
+    extra = synthetic_corpus(int(size * OPEN_RATIO), seed=1, open_ratio=1.0)
+    extra = [ticket.replace('<span>24000', '<span>25000', 1) for ticket in extra]
+    extra_parsed = [ocgisapp._content_parsing(ticket, extractor, DISTRICTS, CLOSED_STATUSES, _template(), WKID, project_geometry=False) for ticket in extra]
+    with tempfile.TemporaryDirectory() as directory:
+        write_corpus(directory, tickets + extra)
+        with open(f'{directory}/printTickets.html', 'w', encoding='utf-8') as page_file:
+            page_file.write('<html><body>' + ''.join(tickets) + '</body></html>')
+        layer = FakeFeatureLayer(_existing_features(parsed[:int(size * EXISTING_RATIO)] + extra_parsed))
+        app = ocgisapp.OcGisApp.replay(directory, layer, districts=DISTRICTS, closed_statuses=CLOSED_STATUSES)
+        _timed(results, 'run', size + len(extra), app.run)
+        results['run']['query_requests'] = layer.query_count
+        results['run']['edit_requests'] = layer.edit_count
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000], help='Corpus sizes to benchmark.')
+    parser.add_argument('--json', help='Write the results to this file as JSON.')
+    args = parser.parse_args()
+    logging.getLogger('ocgis').setLevel(logging.WARNING)
+
+    report = {}
+    print(f"{'size':>7} {'stage':<11} {'seconds':>9} {'tickets/s':>11} {'ms/ticket':>10}")
+    for size in args.sizes:
+        report[size] = bench(size)
+        for stage, result in report[size].items():
+            print(f"{size:>7} {stage:<11} {result['seconds']:>9.3f} {result['tickets_per_second']:>11.1f} {result['ms_per_ticket']:>10.3f}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as report_file:
+            json.dump(report, report_file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,10 @@
-import logging
+# OcGisApp is imported on first access, so `import ocgis` and the command line interface stay
+# fast and logging is left for the application to configure.
+__all__ = ['OcGisApp']
 
-logging.basicConfig(
-    level=logging.DEBUG, 
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 
-from .ocgisapp import OcGisApp
\ No newline at end of file
+def __getattr__(name):
+    if name == 'OcGisApp':
+        from .ocgisapp import OcGisApp
+        return OcGisApp
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+LOGGER = logging.getLogger(__name__)
+
+INDEX_FILE = 'index.json'
+OBJECTS_DIRECTORY = 'objects'
+
+
+class TicketPageCache:
+    """
+    On-disk cache of raw ticket html keyed by ticket number.
+
+    Pages are stored content addressed under `objects/`, so identical pages are kept once, and
+    an index maps each ticket number to its page hash, fetch time, last access time and final
+    flag. A page is fresh for `ttl` seconds after it was fetched. Pages of final tickets, whose
+    district statuses are all closed, never expire and are not evicted. When the cache grows
+    past `max_bytes` the least recently used non-final pages are evicted.
+
+    Args:
+        directory (str): Directory holding the cache, created if needed.
+        ttl (float): Seconds a page is considered fresh.
+        max_bytes (int): Maximum total size of the cached pages.
+    """
+
+    def __init__(self, directory: str, ttl: float = 3600, max_bytes: int = 256 * 1024 * 1024):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._index = {}
+        os.makedirs(os.path.join(directory, OBJECTS_DIRECTORY), exist_ok=True)
+        index_path = os.path.join(directory, INDEX_FILE)
+        if os.path.exists(index_path):
+            try:
+                with open(index_path, 'r', encoding='utf-8') as index_file:
+                    self._index = json.load(index_file)
+            except (OSError, ValueError):
+                LOGGER.exception(f"Could not read cache index '{index_path}', starting with an empty cache.")
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.directory, OBJECTS_DIRECTORY, digest[:2], f'{digest}.html')
+
+    def _read_object(self, digest: str) -> str | None:
+        try:
+            with open(self._object_path(digest), 'r', encoding='utf-8') as page_file:
+                return page_file.read()
+        except OSError:
+            return None
+
+    def __contains__(self, ticket_number) -> bool:
+        return str(ticket_number) in self._index
+
+    def ticket_numbers(self) -> list:
+        """Ticket numbers of every cached page."""
+        with self._lock:
+            return list(self._index)
+
+    def stats(self) -> dict:
+        """Number of cached tickets, final tickets and stored pages, and their total size in bytes."""
+        with self._lock:
+            sizes = {entry['hash']: entry['size'] for entry in self._index.values()}
+            fetched = [entry['fetched_at'] for entry in self._index.values()]
+            return {
+                'tickets': len(self._index),
+                'final': sum(1 for entry in self._index.values() if entry['final']),
+                'fresh': sum(1 for entry in self._index.values() if time.time() - entry['fetched_at'] < self.ttl),
+                'pages': len(sizes),
+                'bytes': sum(sizes.values()),
+                'oldest_fetch': min(fetched, default=None),
+                'newest_fetch': max(fetched, default=None),
+            }
+
+    def is_final(self, ticket_number) -> bool:
+        """Check whether a ticket is flagged final and should never be fetched again."""
+        entry = self._index.get(str(ticket_number))
+        return bool(entry and entry['final'])
+
+    def get(self, ticket_number) -> str | None:
+        """Get the page of a ticket if it is final or still fresh, otherwise None."""
+        with self._lock:
+            entry = self._index.get(str(ticket_number))
+            if entry is None or not (entry['final'] or time.time() - entry['fetched_at'] < self.ttl):
+                return None
+            return self.read(ticket_number)
+
+    def read(self, ticket_number) -> str | None:
+        """Get the cached page of a ticket regardless of its age, for offline re-parsing."""
+        with self._lock:
+            entry = self._index.get(str(ticket_number))
+            if entry is None:
+                return None
+            page = self._read_object(entry['hash'])
+            if page is None:
+                del self._index[str(ticket_number)]
+                return None
+            entry['accessed_at'] = time.time()
+            return page
+
+    def put(self, ticket_number, page: str, final: bool = False):
+        """Store the page of a ticket, flagging it final when all its statuses are closed."""
+        content = page.encode('utf-8')
+        digest = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            object_path = self._object_path(digest)
+            if not os.path.exists(object_path):
+                os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                with open(object_path, 'wb') as page_file:
+                    page_file.write(content)
+            now = time.time()
+            previous = self._index.get(str(ticket_number))
+            self._index[str(ticket_number)] = {
+                'hash': digest,
+                'size': len(content),
+                'fetched_at': now,
+                'accessed_at': now,
+                'final': final,
+            }
+            # The previous page of the ticket is dropped unless another ticket has the same page.
+            if previous is not None and previous['hash'] != digest and all(entry['hash'] != previous['hash'] for entry in self._index.values()):
+                self._remove_object(previous['hash'])
+            self._evict()
+
+    def _remove_object(self, digest: str):
+        try:
+            os.remove(self._object_path(digest))
+        except OSError:
+            LOGGER.warning(f"Could not remove cached page '{digest}'.")
+
+    def _evict(self):
+        sizes = {entry['hash']: entry['size'] for entry in self._index.values()}
+        total = sum(sizes.values())
+        if total <= self.max_bytes:
+            return
+        references = Counter(entry['hash'] for entry in self._index.values())
+        candidates = sorted((entry['accessed_at'], ticket_number) for ticket_number, entry in self._index.items() if not entry['final'])
+        for _, ticket_number in candidates:
+            if total <= self.max_bytes:
+                break
+            digest = self._index.pop(ticket_number)['hash']
+            references[digest] -= 1
+            if not references[digest]:
+                total -= sizes[digest]
+                self._remove_object(digest)
+
+    def save(self):
+        """Write the cache index to disk."""
+        with self._lock:
+            index_path = os.path.join(self.directory, INDEX_FILE)
+            temporary_path = f'{index_path}.tmp'
+            with open(temporary_path, 'w', encoding='utf-8') as index_file:
+                json.dump(self._index, index_file)
+            os.replace(temporary_path, index_path)
@@ -0,0 +1,199 @@
+"""Command line interface, see `ocgis --help`.
+
+The configuration file uses the TOML format of the README. Heavy dependencies are imported by
+the subcommands that need them, so `parse` and `cache` start without arcgis or selenium.
+"""
+import argparse
+import json
+import logging
+import logging.config
+import sys
+
+try:
+    import tomllib
+except ModuleNotFoundError:
+    import tomli as tomllib
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = 'config.toml'
+
+# Configuration keys of each section and the `OcGisApp` argument they set. Every key of the
+# [settings] section is passed through as an argument of the same name.
+SECTION_OPTIONS = {
+    'arcgis': {
+        'username': 'arcgis_username',
+        'password': 'arcgis_password',
+        'link': 'arcgis_link',
+        'layer_url': 'layer_url',
+    },
+    'onecall': {
+        'username': 'onecall_username',
+        'password': 'onecall_password',
+        'login_url': 'onecall_login_url',
+        'closed_statuses': 'closed_statuses',
+        'districts': 'districts',
+        'state': 'state',
+    },
+    'webdriver': {
+        'headless': 'headless',
+        'driver_executable_path': 'driver_executable_path',
+    },
+}
+
+
+def load_config(path: str) -> dict:
+    """Read a TOML configuration file."""
+    with open(path, 'rb') as config_file:
+        return tomllib.load(config_file)
+
+
+def app_options(config: dict) -> dict:
+    """Convert a configuration into `OcGisApp` keyword arguments."""
+    options = {}
+    for section, keys in SECTION_OPTIONS.items():
+        for key, option in keys.items():
+            if key in config.get(section, {}):
+                options[option] = config[section][key]
+    options.update(config.get('settings', {}))
+    # The webdriver path is not needed by the http and replay backends.
+    options.setdefault('driver_executable_path', None)
+    return options
+
+
+def _configure_logging(config: dict, verbose: bool):
+    if 'logging' in config:
+        logging.config.dictConfig(config['logging'])
+    else:
+        logging.basicConfig(level=logging.DEBUG if verbose else logging.INFO,
+                            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+
+def _create_app(config: dict):
+    from .ocgisapp import OcGisApp
+    return OcGisApp(**app_options(config))
+
+
+def _run(args, config: dict) -> int:
+    app = _create_app(config)
+    report = app.run(update_range=args.update_range, recheck_open=not args.no_recheck)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+def _serve(args, config: dict) -> int:
+    app = _create_app(config)
+    app.serve(interval=args.interval, full_sweep_interval=args.full_sweep_interval, max_cycles=args.max_cycles)
+    return 0
+
+
+def _run_all(args, config: dict) -> int:
+    from .runner import FanOutRunner
+    configs = []
+    for path in args.configs:
+        options = app_options(load_config(path))
+        options.setdefault('name', path)
+        configs.append(options)
+    results = FanOutRunner(configs, max_concurrency=args.max_concurrency).run(update_range=args.update_range, recheck_open=not args.no_recheck)
+    print(json.dumps({result.name: result.report if result.ok else {'error': repr(result.error)} for result in results}, indent=2))
+    return 0 if all(result.ok for result in results) else 1
+
+
+def _read_pages(args, config: dict) -> list:
+    """Html of each ticket in the given files, or in the page cache when no file is given."""
+    from .fetchers import iter_ticket_chunks
+    pages = []
+    for path in args.files:
+        with open(path, 'r', encoding='utf-8') as page_file:
+            content = page_file.read()
+        # A print tickets page holds many tickets, any other page is parsed as a single ticket.
+        pages += list(iter_ticket_chunks([content])) or [content]
+    if not args.files:
+        from .cache import TicketPageCache
+        cache = TicketPageCache(_cache_path(args, config))
+        pages = [page for page in map(cache.read, cache.ticket_numbers()) if page is not None]
+    return pages
+
+
+def _parse(args, config: dict) -> int:
+    from .attribute_maps import NEW_ATTRIBUTE_MAP
+    from .extraction import TicketExtractor
+    from .ocgisapp import _feature_template, _parse_tickets
+    settings = config.get('settings', {})
+    onecall = config.get('onecall', {})
+    ticket_dictionaries = _parse_tickets(tickets_content=_read_pages(args, config),
+                                         extractor=TicketExtractor(NEW_ATTRIBUTE_MAP),
+                                         districts=onecall.get('districts', []),
+                                         closed_statuses=onecall.get('closed_statuses', ["Closed, Marked"]),
+                                         dictionary_format=_feature_template({'wkid': args.wkid}),
+                                         spatial_reference=args.wkid,
+                                         simplify_tolerance=settings.get('simplify_tolerance'),
+                                         coordinate_precision=settings.get('coordinate_precision'))
+    for ticket_dictionary in ticket_dictionaries:
+        print(json.dumps(ticket_dictionary))
+    return 0
+
+
+def _cache_path(args, config: dict) -> str:
+    path = args.cache_path or config.get('settings', {}).get('cache_path')
+    if not path:
+        raise SystemExit("No cache directory, pass --cache-path or set cache_path in [settings].")
+    return path
+
+
+def _cache(args, config: dict) -> int:
+    from .cache import TicketPageCache
+    print(json.dumps(TicketPageCache(_cache_path(args, config)).stats(), indent=2))
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='ocgis', description="Import Iowa One Call tickets into an ArcGIS feature layer.")
+    parser.add_argument('-c', '--config', default=DEFAULT_CONFIG, help=f"TOML configuration file, defaults to '{DEFAULT_CONFIG}'.")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Log debug messages when the configuration has no [logging] section.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help="Pull tickets and write them to the layer once, then print the run report.")
+    run_parser.add_argument('--update-range', type=int, help="Days to look back, defaults to update_range in [settings].")
+    run_parser.add_argument('--no-recheck', action='store_true', help="Skip the re-check of open tickets outside the update range.")
+    run_parser.set_defaults(handler=_run)
+
+    run_all_parser = subparsers.add_parser('run-all', help="Run several configuration files concurrently, sharing ArcGIS and One Call sessions.")
+    run_all_parser.add_argument('configs', nargs='+', help="TOML configuration file of each app, --config only sets up logging.")
+    run_all_parser.add_argument('--max-concurrency', type=int, default=4, help="Maximum number of apps running at the same time, defaults to 4.")
+    run_all_parser.add_argument('--update-range', type=int, help="Days to look back, defaults to update_range in each file.")
+    run_all_parser.add_argument('--no-recheck', action='store_true', help="Skip the re-check of open tickets outside the update range.")
+    run_all_parser.set_defaults(handler=_run_all)
+
+    serve_parser = subparsers.add_parser('serve', help="Run continuously on an interval.")
+    serve_parser.add_argument('--interval', type=float, required=True, help="Seconds between the start of two cycles.")
+    serve_parser.add_argument('--full-sweep-interval', type=float, default=86400, help="Seconds between two full window sweeps.")
+    serve_parser.add_argument('--max-cycles', type=int, help="Stop after this many cycles.")
+    serve_parser.set_defaults(handler=_serve)
+
+    parse_parser = subparsers.add_parser('parse', help="Parse saved ticket pages offline and print one feature per line as JSON.")
+    parse_parser.add_argument('files', nargs='*', help="Html files of ticket or print tickets pages, defaults to every cached page.")
+    parse_parser.add_argument('--cache-path', help="Page cache directory, defaults to cache_path in [settings].")
+    parse_parser.add_argument('--wkid', type=int, default=3857, help="WKID to project the rings to, defaults to 3857.")
+    parse_parser.set_defaults(handler=_parse)
+
+    cache_parser = subparsers.add_parser('cache', help="Print statistics of the page cache.")
+    cache_parser.add_argument('--cache-path', help="Page cache directory, defaults to cache_path in [settings].")
+    cache_parser.set_defaults(handler=_cache)
+    return parser
+
+
+def main(argv: list | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        config = load_config(args.config)
+    except FileNotFoundError:
+        if args.command in ('run', 'serve'):
+            raise SystemExit(f"Configuration file '{args.config}' not found.")
+        config = {}
+    _configure_logging(config, args.verbose)
+    return args.handler(args, config)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
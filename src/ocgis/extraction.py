@@ -0,0 +1,97 @@
+import logging
+import re
+from lxml import etree, html
+
+LOGGER = logging.getLogger(__name__)
+
+WHITESPACE = re.compile(r'\s+')
+STATUS_TABLE_HEADERS = {'District', 'Company Name', 'Status'}
+
+
+def _class_test(class_name: str) -> str:
+    """XPath predicate matching elements that have `class_name` as one of their classes."""
+    return f'contains(concat(" ", normalize-space(@class), " "), " {class_name} ")'
+
+
+class TicketExtractor:
+    """Extracts attributes, statuses and polygon coordinates from a ticket page.
+
+    Every XPath expression is compiled once when the extractor is created, so parsing a
+    ticket only costs one lxml parse and the evaluation of the compiled expressions.
+
+    Args:
+        attribute_map (dict): Mapping of attribute name to xpath expression, attributes with
+        a `None` expression are skipped.
+        status_headers (set): Headers identifying the district status table.
+    """
+
+    _tables = etree.XPath('//table')
+    _table_headers = etree.XPath('.//th/text()')
+    _table_rows = etree.XPath('.//tbody/tr')
+    _row_cells = etree.XPath('td/text()')
+    _polygon_headers = etree.XPath(f'//div[{_class_test("pure-u-md-1-1")}]')
+    _first_bold = etree.XPath('(.//b)[1]')
+    _bold_with_text = etree.XPath('boolean(.//b[text()])')
+    _is_coordinate_div = etree.XPath(f'boolean(self::div[{_class_test("pure-u-md-1-3")}])')
+
+    def __init__(self, attribute_map: dict, status_headers: set = STATUS_TABLE_HEADERS):
+        self.attribute_map = attribute_map
+        self.status_headers = set(status_headers)
+        self._attribute_xpaths = {
+            attribute: etree.XPath(f'{identifier}/text()')
+            for attribute, identifier in attribute_map.items()
+            if identifier
+        }
+
+    def __getstate__(self):
+        # Compiled xpaths cannot be pickled, rebuild them from the attribute map instead.
+        return {'attribute_map': self.attribute_map, 'status_headers': self.status_headers}
+
+    def __setstate__(self, state):
+        self.__init__(state['attribute_map'], state['status_headers'])
+
+    def parse(self, html_content: str):
+        """Parse the ticket html once and return the lxml tree used by the other methods."""
+        return html.fromstring(html_content)
+
+    def attributes(self, tree) -> dict:
+        """Get the value of each attribute in the attribute map, whitespace normalized."""
+        attributes = {}
+        for attribute, xpath in self._attribute_xpaths.items():
+            try:
+                content = xpath(tree)
+                content = content[0] if content else ''
+                attributes[attribute] = WHITESPACE.sub(' ', content).strip()
+            except Exception:
+                LOGGER.exception(f"Error finding value for '{attribute}'")
+        return attributes
+
+    def status_table(self, tree) -> list | None:
+        """Find the district status table and convert it to a list of row dictionaries."""
+        for table in self._tables(tree):
+            headers = self._table_headers(table)
+            if self.status_headers.issubset(headers):
+                return [dict(zip(headers, self._row_cells(row))) for row in self._table_rows(table)]
+        LOGGER.debug(f"No table found for headers '{self.status_headers}'.")
+        return None
+
+    def polygons(self, tree) -> list:
+        """Get the [lat, lon] coordinates of each polygon listed on the ticket."""
+        geometry_rings = []
+        for header in self._polygon_headers(tree):
+            if not self._first_bold(header):
+                continue
+            polygon_data = []
+            # Coordinates are the sibling divs up to the next polygon header.
+            for element in header.itersiblings():
+                if not isinstance(element.tag, str):
+                    continue
+                if self._bold_with_text(element):
+                    break
+                if self._is_coordinate_div(element):
+                    text = element.text_content().strip()
+                    if text.startswith('(') and text.endswith(')'):
+                        polygon_data.append([float(coord.strip()) for coord in text[1:-1].strip().split(',')])
+            if polygon_data:
+                geometry_rings.append(polygon_data)
+        return geometry_rings
@@ -0,0 +1,416 @@
+from __future__ import annotations
+
+import abc
+import itertools
+import logging
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+from urllib.parse import urljoin
+
+from lxml import html
+
+# selenium and requests are imported by the backend that uses them, so importing the package
+# and parsing pages offline does not pay for them.
+if TYPE_CHECKING:
+    import requests
+    from selenium import webdriver
+
+LOGGER = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+LEGACY_APPLICATION_URL = "https://ia.itic.occinc.com/legacyApplication"
+LEGACY_LOGIN_URL = "https://ia.itic.occinc.com/iarecApp/servlet/Login?enc=zyfGx9MlUXnIWnwgDj%2BZiRogVJ1R215Lv3ldmSL6HqerScjlqNXM0NfCofWhgsBA%2F8v3Qc%2FybibEMwaN%2Bu%2F3ZhhiUzpdbS0s7pzIDYWfZIrbNxpPaE0LctfqPuWZ%2FVUn"
+TICKET_SEARCH_URL = "https://ia.itic.occinc.com/iarecApp/ticketSearchAndStatusSelector.jsp"
+PRINT_TICKETS_PAGE = 'printTickets.jsp'
+LOGIN_FORM_XPATH = '//*[@id="username"]'
+TICKET_SEPARATOR = '<h1 style="text-align:center;">Iowa One Call</h1>'
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+def iter_ticket_chunks(pieces):
+    """
+    Split the print tickets page into the html of each ticket as it arrives.
+
+    Equivalent to `page.split(TICKET_SEPARATOR)[1:]` but works on an iterable of text pieces
+    and only buffers the ticket being read, so the whole page never has to be held at once.
+
+    Args:
+        pieces (iterable): Consecutive pieces of the page text.
+
+    Yields:
+        str: Html of each ticket, without the separator.
+    """
+    buffer = ''
+    started = False
+    for piece in pieces:
+        buffer = buffer + piece if buffer else piece
+        position = 0
+        while True:
+            index = buffer.find(TICKET_SEPARATOR, position)
+            if index < 0:
+                break
+            if started:
+                yield buffer[position:index]
+            started = True
+            position = index + len(TICKET_SEPARATOR)
+        # Before the first ticket only a possible partial separator needs to be kept.
+        buffer = buffer[position:] if started else buffer[-(len(TICKET_SEPARATOR) - 1):]
+    if started:
+        yield buffer
+
+
+def _is_login_page(page_source: str) -> bool:
+    """Check whether a page is the login form, which is served once a session has expired."""
+    return bool(page_source) and 'username' in page_source and bool(html.fromstring(page_source).xpath(LOGIN_FORM_XPATH))
+
+def _audit_dates(update_range: int) -> tuple:
+    """Start and end dates of the audit search, as entered in the search form."""
+    return (datetime.now() - timedelta(days=update_range)).strftime('%Y-%m-%d'), datetime.now().strftime('%Y-%m-%d')
+
+
+# ----- Webdriver navigation -----
+
+def _login(driver: webdriver.Edge, username: str, password: str, login_url: str):
+    """Log in to One Call and open the legacy application."""
+    from selenium.webdriver.common.by import By
+    driver.get(login_url)
+    driver.find_element(
+        By.XPATH, '//*[@id="username"]').send_keys(username)
+    driver.find_element(
+        By.XPATH, '//*[@name="password"]').send_keys(password)
+    driver.find_element(By.XPATH, '//*[@id="btn-login"]').click()
+    driver.get(LEGACY_APPLICATION_URL)
+    driver.get(LEGACY_LOGIN_URL)
+
+def _website_navigation(driver: webdriver.Edge, username: str, password: str, login_url: str, update_range: int) -> str:
+    """Navigate to legacy site page to get ticket data.
+
+    Returns:
+        str: html content of website.
+    """
+
+    _login(driver, username, password, login_url)
+    return _ticket_search(driver, update_range)
+
+def _ticket_search(driver: webdriver.Edge, update_range: int) -> str:
+    """Search the tickets audited in the last `update_range` days from the legacy search page.
+
+    Returns:
+        str: html content of the print tickets page.
+    """
+    from selenium.webdriver.common.by import By
+    start_date, end_date = _audit_dates(update_range)
+    textbox = driver.find_element(By.XPATH, '//input[@id="auditStartDate"]')
+    textbox.clear()
+    textbox.send_keys(start_date)
+    textbox = driver.find_element(By.XPATH, '//input[@id="auditEndDate"]')
+    textbox.clear()
+    textbox.send_keys(end_date)
+    # Click ticket search button
+    driver.find_element(By.XPATH, '//input[@value="Show Tickets"]').click()
+
+    driver.execute_script(f"javascript:popupTktInfo('{PRINT_TICKETS_PAGE}')")
+    main_window = driver.current_window_handle
+
+    # Get handles of all open windows
+    all_windows = driver.window_handles
+
+    # Switch to the new window (assuming it is the second one)
+    for window in all_windows:
+        if window != main_window:
+            driver.switch_to.window(window)
+            break
+    tickets_content = driver.page_source
+    # Close the popup so a long lived driver does not accumulate windows.
+    if driver.current_window_handle != main_window:
+        driver.close()
+        driver.switch_to.window(main_window)
+    return tickets_content
+
+def _single_ticket_lookup(driver: webdriver.Edge, ticket_number: int, state: str) -> str:
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import Select
+    driver.get(TICKET_SEARCH_URL)
+
+    textbox = driver.find_element(By.XPATH, '//input[@id="ticketNumber"]')
+    textbox.clear()
+    textbox.send_keys(str(ticket_number))
+
+    Select(driver.find_element(By.XPATH, '//select[@name="db"]')).select_by_visible_text(state)
+
+    driver.find_element(By.XPATH, '//*[@name="Search"]').click()
+    driver.execute_script('window.matchMedia("print").matches = true;')
+    return driver.page_source
+
+
+# ----- HTTP navigation -----
+
+def _form_values(form) -> dict:
+    """Collect the values a browser would submit for a form, without any submit buttons."""
+    values = {}
+    for element in form.xpath('.//input[@name] | .//select[@name] | .//textarea[@name]'):
+        name = element.get('name')
+        if element.tag == 'select':
+            options = element.xpath('.//option[@selected]') or element.xpath('.//option')
+            if options:
+                values[name] = options[0].get('value', options[0].text_content().strip())
+        elif element.tag == 'textarea':
+            values[name] = element.text_content()
+        else:
+            input_type = (element.get('type') or 'text').lower()
+            if input_type in ('submit', 'button', 'image', 'reset', 'file'):
+                continue
+            if input_type in ('checkbox', 'radio') and element.get('checked') is None:
+                continue
+            values[name] = element.get('value', '')
+    return values
+
+def _submit_form(session: requests.Session, response: requests.Response, form_xpath: str, values: dict, submit_xpath: str = None, timeout: float = 60) -> requests.Response:
+    """
+    Submit a form found on a page the way a browser would.
+
+    Args:
+        session (requests.Session): Session holding the login cookies.
+        response (requests.Response): Response containing the form.
+        form_xpath (str): Xpath selecting the form.
+        values (dict): Field values overriding the form's defaults.
+        submit_xpath (str, optional): Xpath of the submit button, relative to the form, whose
+            name and value are sent with the form.
+
+    Returns:
+        requests.Response: Response to the submitted form.
+
+    Raises:
+        ValueError: If the form is not found on the page.
+    """
+    tree = html.fromstring(response.text)
+    forms = tree.xpath(form_xpath)
+    if not forms:
+        raise ValueError(f"Form '{form_xpath}' not found on '{response.url}'.")
+    form = forms[0]
+    data = _form_values(form)
+    if submit_xpath:
+        buttons = form.xpath(submit_xpath)
+        if buttons and buttons[0].get('name'):
+            data[buttons[0].get('name')] = buttons[0].get('value', '')
+    data.update(values)
+    action = urljoin(response.url, form.get('action') or response.url)
+    if (form.get('method') or 'get').lower() == 'post':
+        result = session.post(action, data=data, timeout=timeout)
+    else:
+        result = session.get(action, params=data, timeout=timeout)
+    result.raise_for_status()
+    return result
+
+def _select_value(response: requests.Response, select_xpath: str, text: str) -> str:
+    """Get the value of the option of a select whose visible text is `text`."""
+    options = html.fromstring(response.text).xpath(f'{select_xpath}/option')
+    for option in options:
+        if option.text_content().strip() == text:
+            return option.get('value', text)
+    raise ValueError(f"No option '{text}' for '{select_xpath}' on '{response.url}'.")
+
+
+class TicketFetcher(abc.ABC):
+    """
+    Retrieves ticket pages from One Call.
+
+    Parsing and staging only use the html returned here, so any backend that can log in and
+    return the print tickets page and single ticket pages can be used by `OcGisApp`. Backends
+    must implement `fetch_tickets` and `lookup_ticket`.
+    """
+
+    @abc.abstractmethod
+    def fetch_tickets(self, update_range: int) -> str:
+        """Get the print tickets page for the tickets audited in the last `update_range` days."""
+
+    def iter_tickets(self, update_range: int):
+        """Yield the html of each ticket on the print tickets page, see `iter_ticket_chunks`.
+
+        Backends that can stream the page override this to avoid holding it in memory.
+        """
+        return iter_ticket_chunks([self.fetch_tickets(update_range)])
+
+    @abc.abstractmethod
+    def lookup_ticket(self, ticket_number: str, state: str) -> str:
+        """Get the page of a single ticket."""
+
+    def close(self):
+        """Release the resources held by the fetcher."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class WebdriverFetcher(TicketFetcher):
+    """
+    Fetches ticket pages by driving Microsoft Edge with selenium.
+
+    The browser is started on first use and stays logged in until `close`, logging in again
+    when a page shows that the session has expired.
+    """
+
+    def __init__(self, username: str, password: str, login_url: str, driver_executable_path: str, headless: bool = False):
+        self.username = username
+        self.password = password
+        self.login_url = login_url
+        self.driver_executable_path = driver_executable_path
+        self.headless = headless
+        self._driver = None
+        self._logged_in = False
+
+    @property
+    def driver(self) -> webdriver.Edge:
+        if self._driver is None:
+            from selenium import webdriver
+            from selenium.webdriver.edge.options import Options
+            from selenium.webdriver.edge.service import Service
+            driver_options = Options()
+            if self.headless:
+                driver_options.add_argument('--headless')
+            driver_options.add_argument('--log-level=3')
+            driver_options.add_argument(f'user-agent={USER_AGENT}')
+            #driver_options.add_argument("--kiosk-printing")
+            driver_service = Service(executable_path=self.driver_executable_path)
+            self._driver = webdriver.Edge(options=driver_options,
+                                          service=driver_service, keep_alive=True)
+            self._driver.implicitly_wait(20)
+        return self._driver
+
+    def _login(self):
+        _login(self.driver, self.username, self.password, self.login_url)
+        self._logged_in = True
+
+    def fetch_tickets(self, update_range: int) -> str:
+        if not self._logged_in:
+            tickets_content = _website_navigation(driver=self.driver, username=self.username, password=self.password, login_url=self.login_url, update_range=update_range)
+            self._logged_in = True
+            return tickets_content
+        self.driver.get(LEGACY_LOGIN_URL)
+        if _is_login_page(self.driver.page_source):
+            LOGGER.info("One Call session expired, logging in again.")
+            self._login()
+        return _ticket_search(self.driver, update_range)
+
+    def lookup_ticket(self, ticket_number: str, state: str) -> str:
+        if not self._logged_in:
+            self._login()
+        page_source = _single_ticket_lookup(self.driver, ticket_number, state)
+        if _is_login_page(page_source):
+            LOGGER.info("One Call session expired, logging in again.")
+            self._login()
+            page_source = _single_ticket_lookup(self.driver, ticket_number, state)
+        return page_source
+
+    def close(self):
+        if self._driver is not None:
+            self._driver.quit()
+            self._driver = None
+            self._logged_in = False
+
+
+class HttpFetcher(TicketFetcher):
+    """
+    Fetches ticket pages with plain HTTP requests instead of a browser.
+
+    The same login, legacy redirect, audit date search, print tickets and ticket search steps
+    as `WebdriverFetcher` are performed by submitting the site's forms with a keep-alive
+    `requests.Session`, which also keeps the login cookies between requests. When a page
+    shows that the session has expired the fetcher logs in again and retries once.
+    """
+
+    def __init__(self, username: str, password: str, login_url: str, timeout: float = 60, pool_size: int = 4):
+        self.username = username
+        self.password = password
+        self.login_url = login_url
+        self.timeout = timeout
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._logged_in = False
+
+    def _get(self, url: str, **kwargs) -> requests.Response:
+        response = self.session.get(url, timeout=self.timeout, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def login(self):
+        """Log in to One Call and open the legacy application."""
+        login_page = self._get(self.login_url)
+        username_field = html.fromstring(login_page.text).xpath('//*[@id="username"]/@name') or ['username']
+        _submit_form(self.session, login_page, '//form[.//*[@id="username"]]',
+                     {username_field[0]: self.username, 'password': self.password},
+                     submit_xpath='.//*[@id="btn-login"]', timeout=self.timeout)
+        self._get(LEGACY_APPLICATION_URL)
+        self._get(LEGACY_LOGIN_URL)
+        self._logged_in = True
+
+    def _with_session(self, request):
+        """Call `request`, logging in first if needed and again if the session expired."""
+        if not self._logged_in:
+            self.login()
+        try:
+            page = request()
+        except ValueError:
+            # A missing form usually means the login page was served instead.
+            page = None
+        if page is None or _is_login_page(page):
+            LOGGER.info("One Call session expired, logging in again.")
+            self.login()
+            page = request()
+        return page
+
+    def _ticket_search(self, update_range: int, stream: bool = False) -> requests.Response:
+        start_date, end_date = _audit_dates(update_range)
+        search_page = self._get(LEGACY_LOGIN_URL)
+        search_results = _submit_form(self.session, search_page, '//form[.//input[@id="auditStartDate"]]',
+                                      {'auditStartDate': start_date, 'auditEndDate': end_date},
+                                      submit_xpath='.//input[@value="Show Tickets"]', timeout=self.timeout)
+        return self._get(urljoin(search_results.url, PRINT_TICKETS_PAGE), stream=stream)
+
+    def _single_ticket_lookup(self, ticket_number: str, state: str) -> str:
+        search_page = self._get(TICKET_SEARCH_URL)
+        values = {'ticketNumber': str(ticket_number), 'db': _select_value(search_page, '//select[@name="db"]', state)}
+        return _submit_form(self.session, search_page, '//form[.//input[@id="ticketNumber"]]', values,
+                            submit_xpath='.//*[@name="Search"]', timeout=self.timeout).text
+
+    def fetch_tickets(self, update_range: int) -> str:
+        return self._with_session(lambda: self._ticket_search(update_range).text)
+
+    def iter_tickets(self, update_range: int):
+        """Stream the print tickets page, only the first block is read before the session is checked."""
+        if not self._logged_in:
+            self.login()
+        for attempt in range(2):
+            try:
+                response = self._ticket_search(update_range, stream=True)
+            except ValueError:
+                # A missing form usually means the login page was served instead.
+                response = None
+            if response is not None:
+                response.encoding = response.encoding or 'utf-8'
+                pieces = response.iter_content(chunk_size=STREAM_BLOCK_SIZE, decode_unicode=True)
+                first = next(pieces, '')
+                if not _is_login_page(first):
+                    break
+                response.close()
+            if attempt:
+                raise ValueError("One Call served the login page after logging in again.")
+            LOGGER.info("One Call session expired, logging in again.")
+            self.login()
+        with response:
+            yield from iter_ticket_chunks(itertools.chain([first], pieces))
+
+    def lookup_ticket(self, ticket_number: str, state: str) -> str:
+        return self._with_session(lambda: self._single_ticket_lookup(ticket_number, state))
+
+    def close(self):
+        self.session.close()
+        self._logged_in = False
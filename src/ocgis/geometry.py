@@ -0,0 +1,124 @@
+import json
+import logging
+
+import numpy as np
+
+LOGGER = logging.getLogger(__name__)
+
+# Sine of the angle under which three consecutive vertices are considered collinear.
+COLLINEAR_EPSILON = 1e-12
+
+
+def _drop_duplicates(points: np.ndarray) -> np.ndarray:
+    """Drop consecutive duplicate vertices, including the closing vertex of the ring."""
+    if len(points) < 2:
+        return points
+    keep = np.any(points != np.roll(points, 1, axis=0), axis=1)
+    keep[0] = True
+    points = points[keep]
+    if len(points) > 1 and np.array_equal(points[0], points[-1]):
+        points = points[:-1]
+    return points
+
+
+def _drop_collinear(points: np.ndarray) -> np.ndarray:
+    """Drop vertices lying on the line through their two neighbours, treating the ring as cyclic."""
+    if len(points) < 4:
+        return points
+    incoming = points - np.roll(points, 1, axis=0)
+    outgoing = np.roll(points, -1, axis=0) - points
+    cross = incoming[:, 0] * outgoing[:, 1] - incoming[:, 1] * outgoing[:, 0]
+    scale = np.hypot(*incoming.T) * np.hypot(*outgoing.T)
+    return points[np.abs(cross) > COLLINEAR_EPSILON * scale]
+
+
+def _douglas_peucker(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Mask of the vertices of an open line kept by Douglas-Peucker simplification."""
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        segment = points[end] - points[start]
+        offsets = points[start + 1:end] - points[start]
+        length = np.hypot(*segment)
+        if length:
+            distances = np.abs(segment[0] * offsets[:, 1] - segment[1] * offsets[:, 0]) / length
+        else:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            index = start + 1 + farthest
+            keep[index] = True
+            stack += [(start, index), (index, end)]
+    return keep
+
+
+def _simplify(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Simplify an open ring, split at the vertex farthest from the first so both ends are anchored."""
+    if len(points) < 4:
+        return points
+    split = int(np.argmax(np.hypot(*(points - points[0]).T)))
+    closed = np.vstack((points, points[:1]))
+    keep = np.concatenate((_douglas_peucker(closed[:split + 1], tolerance)[:-1],
+                           _douglas_peucker(closed[split:], tolerance)[:-1]))
+    if keep.sum() < 3:
+        # Keep the vertex farthest from the chord so the ring stays a polygon.
+        chord = points[split] - points[0]
+        offsets = points - points[0]
+        keep[int(np.argmax(np.abs(chord[0] * offsets[:, 1] - chord[1] * offsets[:, 0])))] = True
+    return points[keep]
+
+
+def clean_ring(ring: list, tolerance: float = 0.0, precision: int | None = None) -> list:
+    """
+    Clean up and simplify one polygon ring in layer units.
+
+    Coordinates are rounded to `precision` decimals, consecutive duplicate and collinear
+    vertices are dropped, the ring is simplified with Douglas-Peucker when `tolerance` is
+    positive and it is closed. Simplification never leaves fewer than three vertices.
+
+    Args:
+        ring (list): Ring as a list of [x, y] points.
+        tolerance (float): Maximum distance in layer units a removed vertex may be from the
+            simplified ring, 0 only removes redundant vertices.
+        precision (int, optional): Number of decimals kept, in layer units. Coordinates are
+            left at full precision by default.
+
+    Returns:
+        list: The cleaned and closed ring as a list of [x, y] points.
+    """
+    if not ring:
+        return ring
+    points = np.asarray(ring, dtype=float)
+    if precision is not None:
+        points = np.round(points, precision)
+    cleaned = _drop_collinear(_drop_duplicates(points))
+    if len(cleaned) < 3:
+        cleaned = _drop_duplicates(points)
+    if tolerance > 0:
+        cleaned = _simplify(cleaned, tolerance)
+    cleaned = np.vstack((cleaned, cleaned[:1]))
+    if precision is not None and precision <= 0:
+        return cleaned.astype(np.int64).tolist()
+    return cleaned.tolist()
+
+
+def clean_rings(rings: list, tolerance: float = 0.0, precision: int | None = None) -> list:
+    """Apply `clean_ring` to every ring of a polygon."""
+    return [clean_ring(ring, tolerance, precision) for ring in rings or []]
+
+
+def _closed_length(ring: list) -> int:
+    """Number of vertices of a ring once closed, so open and closed rings compare equally."""
+    if not ring:
+        return 0
+    return len(ring) + (list(ring[0]) != list(ring[-1]))
+
+
+def ring_statistics(rings: list) -> tuple:
+    """Number of vertices of the rings, counted as closed, and size in bytes of their JSON encoding."""
+    vertices = sum(_closed_length(ring) for ring in rings or [])
+    return vertices, len(json.dumps(rings or [], separators=(',', ':')))
@@ -0,0 +1,165 @@
+import contextlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+LOGGER = logging.getLogger(__name__)
+
+_METRIC_NAME = re.compile(r'[^a-zA-Z0-9_]')
+
+
+def _metric_name(name: str) -> str:
+    return _METRIC_NAME.sub('_', name)
+
+
+class RunMetrics:
+    """
+    Wall time per stage and counters collected during one run.
+
+    Stages are timed with the `stage` context manager, which may be entered many times and from
+    several threads, and counters are incremented with `count`.
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self._stages = {}
+        self._counters = Counter()
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """Add the time spent in the block to the stage `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                stage = self._stages.setdefault(name, {'seconds': 0.0, 'calls': 0})
+                stage['seconds'] += seconds
+                stage['calls'] += 1
+
+    def count(self, name: str, value: int = 1):
+        """Increment the counter `name`."""
+        with self._lock:
+            self._counters[name] += value
+
+    def report(self) -> dict:
+        """Structured report of the run so far."""
+        with self._lock:
+            return {
+                'started_at': self.started_at.isoformat(),
+                'duration': time.perf_counter() - self._start,
+                'stages': {name: dict(stage) for name, stage in self._stages.items()},
+                'counters': dict(self._counters),
+            }
+
+
+class MeteredLayer:
+    """Feature layer proxy counting and timing the REST requests made through it."""
+
+    def __init__(self, layer, metrics: RunMetrics):
+        self._layer = layer
+        self._metrics = metrics
+
+    def __getattr__(self, name):
+        return getattr(self._layer, name)
+
+    def query(self, *args, **kwargs):
+        self._metrics.count('rest_requests.query')
+        with self._metrics.stage('rest.query'):
+            return self._layer.query(*args, **kwargs)
+
+    def edit_features(self, *args, **kwargs):
+        self._metrics.count('rest_requests.edit_features')
+        with self._metrics.stage('rest.edit_features'):
+            return self._layer.edit_features(*args, **kwargs)
+
+
+class MeteredFetcher:
+    """Ticket fetcher proxy counting and timing the pages fetched and their size."""
+
+    def __init__(self, fetcher, metrics: RunMetrics):
+        self.fetcher = fetcher
+        self._metrics = metrics
+
+    def fetch_tickets(self, update_range: int) -> str:
+        with self._metrics.stage('fetch.print_tickets'):
+            page = self.fetcher.fetch_tickets(update_range)
+        self._metrics.count('pages_fetched')
+        self._metrics.count('bytes_fetched', len(page.encode('utf-8')))
+        return page
+
+    def iter_tickets(self, update_range: int):
+        tickets = iter(self.fetcher.iter_tickets(update_range))
+        self._metrics.count('pages_fetched')
+        while True:
+            with self._metrics.stage('fetch.print_tickets'):
+                ticket = next(tickets, None)
+            if ticket is None:
+                return
+            self._metrics.count('bytes_fetched', len(ticket.encode('utf-8')))
+            yield ticket
+
+    def lookup_ticket(self, ticket_number: str, state: str) -> str:
+        with self._metrics.stage('fetch.lookup'):
+            page = self.fetcher.lookup_ticket(ticket_number, state)
+        self._metrics.count('pages_fetched')
+        self._metrics.count('bytes_fetched', len(page.encode('utf-8')))
+        return page
+
+    def close(self):
+        self.fetcher.close()
+
+
+def write_jsonl(path: str, report: dict):
+    """Append the report as one JSON line."""
+    with open(path, 'a', encoding='utf-8') as report_file:
+        report_file.write(json.dumps(report) + '\n')
+
+
+def write_prometheus(path: str, report: dict, prefix: str = 'ocgis'):
+    """
+    Write the report in the Prometheus text format, for the node exporter textfile collector.
+
+    The file is replaced atomically so the collector never reads a partial file.
+    """
+    lines = [
+        f'# HELP {prefix}_run_duration_seconds Wall time of the last run.',
+        f'# TYPE {prefix}_run_duration_seconds gauge',
+        f'{prefix}_run_duration_seconds {report["duration"]:.6f}',
+        f'# HELP {prefix}_run_timestamp_seconds Start time of the last run.',
+        f'# TYPE {prefix}_run_timestamp_seconds gauge',
+        f'{prefix}_run_timestamp_seconds {datetime.fromisoformat(report["started_at"]).timestamp():.3f}',
+        f'# HELP {prefix}_stage_seconds Wall time spent in each stage of the last run.',
+        f'# TYPE {prefix}_stage_seconds gauge',
+    ]
+    lines += [f'{prefix}_stage_seconds{{stage="{name}"}} {stage["seconds"]:.6f}' for name, stage in sorted(report['stages'].items())]
+    lines += [
+        f'# HELP {prefix}_stage_calls Number of times each stage ran in the last run.',
+        f'# TYPE {prefix}_stage_calls gauge',
+    ]
+    lines += [f'{prefix}_stage_calls{{stage="{name}"}} {stage["calls"]}' for name, stage in sorted(report['stages'].items())]
+    for name, value in sorted(report['counters'].items()):
+        metric = f'{prefix}_{_metric_name(name)}'
+        lines += [f'# TYPE {metric} gauge', f'{metric} {value}']
+    temporary_path = f'{path}.tmp'
+    with open(temporary_path, 'w', encoding='utf-8') as report_file:
+        report_file.write('\n'.join(lines) + '\n')
+    os.replace(temporary_path, path)
+
+
+def write_report(path: str, report: dict, report_format: str = 'jsonl'):
+    """Write the report as 'jsonl' or 'prometheus'."""
+    if report_format == 'jsonl':
+        write_jsonl(path, report)
+    elif report_format == 'prometheus':
+        write_prometheus(path, report)
+    else:
+        raise ValueError(f"Unknown metrics format '{report_format}', expected 'jsonl' or 'prometheus'.")
@@ -1,151 +1,118 @@
+from __future__ import annotations
+
+import concurrent.futures
+import contextlib
+import copy
+import functools
+import itertools
 import logging
-import arcgis
-from lxml import html
-import re
-from .attribute_maps import NEW_ATTRIBUTE_MAP
-from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.edge.service import Service
-from selenium.webdriver.edge.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import Select
+import multiprocessing
 import time
+from typing import TYPE_CHECKING
+import numpy as np
+from .attribute_maps import NEW_ATTRIBUTE_MAP
+from .cache import TicketPageCache
+from .extraction import TicketExtractor
+from .geometry import clean_rings, ring_statistics
+from .metrics import MeteredFetcher, MeteredLayer, RunMetrics, write_report
+from .fetchers import HttpFetcher, TicketFetcher, WebdriverFetcher
+from .state import RunState, ticket_fingerprint
+from .pipeline import Pipeline
+from .pool import WorkerPool
+from .replay import ReplayFetcher
+from .writer import EditSummary, EditWriter
+from collections import Counter
+from datetime import datetime
+
+# arcgis takes seconds to import, it is only imported when a projection, feature or login needs it.
+if TYPE_CHECKING:
+    import arcgis
 
 LOGGER = logging.getLogger(__name__)
 
 DATE_FORMAT = '%m/%d/%y %I:%M %p'
 
-def _website_navigation(driver: webdriver.Edge, username: str, password: str, login_url: str, update_range: int) -> str:
-    """Navigate to legacy site page to get ticket data.
+WEB_MERCATOR_WKIDS = {3857, 102100, 102113, 900913}
+EARTH_RADIUS = 6378137.0
+MAX_MERCATOR_LATITUDE = 85.0511287798066
+
+def _project_web_mercator(points: np.ndarray) -> np.ndarray:
+    """Project an (n, 2) array of [lat, lon] points to web mercator [x, y]."""
+    latitudes = np.radians(np.clip(points[:, 0], -MAX_MERCATOR_LATITUDE, MAX_MERCATOR_LATITUDE))
+    longitudes = np.radians(points[:, 1])
+    x = EARTH_RADIUS * longitudes
+    y = EARTH_RADIUS * np.log(np.tan(np.pi / 4 + latitudes / 2))
+    return np.column_stack((x, y))
+
+def _project_bulk(points: np.ndarray, spatial_reference: int) -> np.ndarray:
+    """Project an (n, 2) array of [lat, lon] points with a single geometry service call."""
+    import arcgis
+    multipoint = arcgis.geometry.Multipoint({
+        "points": points[:, ::-1].tolist(),
+        "spatialReference": {"wkid": 4326}
+    })
+    projected = arcgis.geometry.project(geometries=[multipoint], in_sr=4326, out_sr=spatial_reference)[0]
+    return np.asarray(projected['points'], dtype=float)
+
+def convert_geometry_rings_batch(coordinate_sets: list, spatial_reference: int = 3857) -> list:
+    """Converts latitude/longitude coordinates for many tickets in one projection.
+
+    Every vertex of every ring is stacked into one array. Web mercator targets are projected
+    locally with NumPy, any other target WKID is projected with one bulk call.
+
+    Args:
+        coordinate_sets (list): List of coordinate lists in the format accepted by
+        `convert_geometry_rings`, one per ticket.
+        spatial_reference (int): WKID to project to.
 
     Returns:
-        str: html content of website.
-    """    
-
-    driver.get(login_url)
-    driver.find_element(
-        By.XPATH, '//*[@id="username"]').send_keys(username)
-    driver.find_element(
-        By.XPATH, '//*[@name="password"]').send_keys(password)
-    driver.find_element(By.XPATH, '//*[@id="btn-login"]').click()
-    driver.get("https://ia.itic.occinc.com/legacyApplication")
-    driver.get("https://ia.itic.occinc.com/iarecApp/servlet/Login?enc=zyfGx9MlUXnIWnwgDj%2BZiRogVJ1R215Lv3ldmSL6HqerScjlqNXM0NfCofWhgsBA%2F8v3Qc%2FybibEMwaN%2Bu%2F3ZhhiUzpdbS0s7pzIDYWfZIrbNxpPaE0LctfqPuWZ%2FVUn")
-
-    textbox = driver.find_element(By.XPATH, '//input[@id="auditStartDate"]')
-    textbox.clear()
-    textbox.send_keys((datetime.now(
-    ) - timedelta(days=update_range)).strftime('%Y-%m-%d'))
-    textbox = driver.find_element(By.XPATH, '//input[@id="auditEndDate"]')
-    textbox.clear()
-    textbox.send_keys(datetime.now().strftime('%Y-%m-%d'))
-    # Click ticket search button
-    driver.find_element(By.XPATH, '//input[@value="Show Tickets"]').click()
-
-    driver.execute_script("javascript:popupTktInfo('printTickets.jsp')")
-    main_window = driver.current_window_handle
-
-    # Get handles of all open windows
-    all_windows = driver.window_handles
-
-    # Switch to the new window (assuming it is the second one)
-    for window in all_windows:
-        if window != main_window:
-            driver.switch_to.window(window)
-            break
-    tickets_content = driver.page_source
-    return tickets_content
+        list: Projected coordinate lists in the same shape as `coordinate_sets`.
+    """
+    ring_lengths = [len(ring) for rings in coordinate_sets for ring in rings]
+    if not sum(ring_lengths):
+        return [[[] for ring in rings] for rings in coordinate_sets]
+    points = np.array([point for rings in coordinate_sets for ring in rings for point in ring], dtype=float)
 
-def _single_ticket_lookup(driver: webdriver.Edge, ticket_number: int, state: str) -> str:
-    driver.get("https://ia.itic.occinc.com/iarecApp/ticketSearchAndStatusSelector.jsp")
-    
-    textbox = driver.find_element(By.XPATH, '//input[@id="ticketNumber"]')
-    textbox.clear()
-    textbox.send_keys(str(ticket_number))
-    
-    Select(driver.find_element(By.XPATH, '//select[@name="db"]')).select_by_visible_text(state)
-    
-    driver.find_element(By.XPATH, '//*[@name="Search"]').click()
-    driver.execute_script('window.matchMedia("print").matches = true;')
-    return driver.page_source
-    
-    
-    
-def convert_geometry_rings(coordinates):
-    """Converts latitude/longitude coordinates to webmercator projection.
+    if spatial_reference in WEB_MERCATOR_WKIDS:
+        projected = _project_web_mercator(points)
+    else:
+        projected = _project_bulk(points, spatial_reference)
+
+    split_points = np.split(projected, np.cumsum(ring_lengths)[:-1])
+    projected_rings = iter(ring.tolist() for ring in split_points)
+    return [[next(projected_rings) for ring in rings] for rings in coordinate_sets]
+
+def convert_geometry_rings(coordinates, spatial_reference: int = 3857):
+    """Converts latitude/longitude coordinates to the layer projection (webmercator by default).
 
     Args:
         coordinates (list): List containing lists of points, potentially for multiple
         geometries - e.g. [[[x1, y1], [x2, y2]], [[a1, b1], [a2, b2]]]
+        spatial_reference (int): WKID to project to.
 
     Returns:
         list: List containing lists of points, potentially for multiple
         geometries - e.g. [[[x1, y1], [x2, y2]], [[a1, b1], [a2, b2]]]
     """
-    final_points = []
-    for polygon in coordinates:
-        webmercator_points = []
-        for lat, lon in polygon:
-            # Create a Point geometry with WGS84 coordinates
-            wgs_point = arcgis.geometry.Point(
-                {"x": lon, "y": lat, "spatialReference": {"wkid": 4326}})
-            # Project the point to Web Mercator (wkid 3857)
-            webmercator_point = wgs_point.project_as(arcgis.geometry.SpatialReference(3857))
-
-            webmercator_points.append(
-                [webmercator_point.x, webmercator_point.y])
-        final_points.append(webmercator_points)
-    return final_points
-
-def _content_parsing(html_content: str, attribute_map: dict, districts: list, closed_statuses: list, dictionary_format: dict, spatial_reference: int) -> dict:
-    # Function to find a table by headers using partial matching
-    def _find_table_by_headers(tree, target_headers):
-        for table in tree.xpath('//table'):
-            # Extract headers of the current table
-            headers = set(table.xpath('.//th/text()'))
-            # Check if all target headers are contained within the table's headers
-            if target_headers.issubset(headers):
-                # Convert table to a list of dictionaries
-                headers = table.xpath('.//th/text()')  # Re-fetch headers to maintain order
-                table_data = []
-                for row in table.xpath('.//tbody/tr'):
-                    cells = row.xpath('td/text()')
-                    row_dict = dict(zip(headers, cells))
-                    table_data.append(row_dict)
-                return table_data
-        LOGGER.debug(f"No table found for headers '{target_headers}'.")
-        return None
-    
-    tree = html.fromstring(html_content)
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
+    return convert_geometry_rings_batch([coordinates], spatial_reference)[0]
+
+def _content_parsing(html_content: str, extractor: TicketExtractor, districts: list, closed_statuses: list, dictionary_format: dict, spatial_reference: int, project_geometry: bool = True) -> dict:
+    """Parse a single ticket into a feature dictionary.
+
+    `dictionary_format` is used as a template and copied, so the returned dictionary is never
+    shared between tickets. With `project_geometry` set to False the rings are left as
+    [lat, lon] pairs so a batch of tickets can be projected together with
+    `convert_geometry_rings_batch`.
+    """
+    tree = extractor.parse(html_content)
     
     # ----- Get attribute data -----
-    attributes = {}
-    
-    
-    # Get value for each attribute in the attribute map using the xpaths
-    for attribute, identifier in attribute_map.items():
-        try:
-            content = tree.xpath(f'{identifier}/text()')
-            if identifier:
-                if type(content) == list and len(content) > 0:
-                    content = content[0]
-                else:
-                    content = ''
-                attributes[attribute] = re.sub(r'\s+', ' ', content).strip()
-            else:
-                #LOGGER.debug(f"No xpath expression for '{attribute}'.")
-                pass
-        except Exception:
-            LOGGER.exception(f"Error finding value for '{attribute}'")
-    
+    attributes = extractor.attributes(tree)
     
     
     # ----- Get statuses -----
     
-    target_headers = {'District', 'Company Name', 'Status'}
-    status_dictionary = _find_table_by_headers(tree, target_headers)
+    status_dictionary = extractor.status_table(tree)
     
     ticket_open = False
     # Check statuses, if any are still open mark ticket as opened and if CFU then update attributes.
@@ -165,46 +132,118 @@ def _content_parsing(html_content: str, attribute_map: dict, districts: list, cl
     
     # ----- Get polygon information -----
     
-    # Find all divs with class "pure-u-md-1-1" containing polygon headers
-    polygon_headers = soup.find_all('div', class_='pure-u-md-1-1')
-    geometry_rings= []
-    # Iterate through each polygon header
-    for header in polygon_headers:
-        polygon_data = []
-        # Find the <b> tag within the header
-        polygon_number_tag = header.find('b')
-        if polygon_number_tag:
-            # Get the polygon number from the <b> tag text
-            polygon_number = polygon_number_tag.text.strip().replace(':', '')
-
-            # Find all following divs until the next polygon header or end of parent div
-            next_element = header.find_next_sibling()
-            # stop when next header is found
-            while next_element and not next_element.find('b', string=True):
-                if next_element.name == 'div' and 'pure-u-md-1-3' in next_element['class']:
-                    text = next_element.get_text().strip()
-                    if text.startswith('(') and text.endswith(')'):
-                        # Remove parentheses and split by comma
-                        coordinates = text[1:-1].strip().split(',')
-                        # Convert to float and append to polygon_data
-                        polygon_data.append([float(coord.strip())
-                                            for coord in coordinates])
-                next_element = next_element.find_next_sibling()
-
-            # Append polygon_data to all_polygons if it has any points
-            if polygon_data:
-                geometry_rings.append(polygon_data)
+    geometry_rings = extractor.polygons(tree)
     
     
     # ----- Return dictionary -----
     
     attributes['lastAutomaticUpdate'] = datetime.now().strftime(DATE_FORMAT)
 
-    dictionary_format['attributes'] = attributes
-    dictionary_format['geometry']['rings'] = convert_geometry_rings(geometry_rings)
-    return dictionary_format
+    ticket_dictionary = copy.deepcopy(dictionary_format)
+    ticket_dictionary['attributes'] = attributes
+    if project_geometry:
+        geometry_rings = convert_geometry_rings(geometry_rings, spatial_reference)
+    ticket_dictionary['geometry']['rings'] = geometry_rings
+    return ticket_dictionary
+
+def _reduce_geometry(ticket_dictionaries: list, tolerance: float | None, precision: int | None, metrics: RunMetrics):
+    """Clean up, simplify and quantize the projected rings of each ticket in place, see `clean_ring`.
+
+    Nothing is done when neither `tolerance` nor `precision` is set. The vertices, counted as
+    closed rings on both sides, and JSON bytes of the rings before and after are added to the
+    `geometry.*` counters.
+    """
+    if tolerance is None and precision is None:
+        return
+    with metrics.stage('geometry'):
+        for ticket_dictionary in ticket_dictionaries:
+            rings = ticket_dictionary['geometry']['rings']
+            vertices_in, bytes_in = ring_statistics(rings)
+            rings = clean_rings(rings, tolerance or 0.0, precision)
+            vertices_out, bytes_out = ring_statistics(rings)
+            ticket_dictionary['geometry']['rings'] = rings
+            metrics.count('geometry.vertices_in', vertices_in)
+            metrics.count('geometry.vertices_out', vertices_out)
+            metrics.count('geometry.bytes_in', bytes_in)
+            metrics.count('geometry.bytes_out', bytes_out)
+
+def _parse_tickets(tickets_content: list, extractor: TicketExtractor, districts: list, closed_statuses: list, dictionary_format: dict, spatial_reference: int, workers: int = 1, executor: str = 'process', metrics: RunMetrics | None = None, pool: concurrent.futures.Executor | None = None, simplify_tolerance: float | None = None, coordinate_precision: int | None = None, project: bool = True) -> list:
+    """Parse many tickets, optionally in parallel, and project their rings in one batch.
+
+    Args:
+        tickets_content (list): Html content of each ticket.
+        workers (int): Number of parsing workers, 1 parses in the calling thread.
+        executor (str): 'process' for a process pool or 'thread' for a thread pool.
+        metrics (RunMetrics, optional): Collects the time spent parsing and projecting.
+        pool (Executor, optional): Pool from `_parse_pool` reused across calls, instead of
+            starting one for this call.
+        simplify_tolerance (float, optional): Simplification tolerance in layer units, see `_reduce_geometry`.
+        coordinate_precision (int, optional): Decimals kept in layer units, see `_reduce_geometry`.
+        project (bool): Whether to project the rings, with False they are left as [lat, lon]
+            pairs for a later `_project_tickets` call.
+
+    Returns:
+        list: Feature dictionaries in the same order as `tickets_content`.
+    """
+    parse = functools.partial(_content_parsing,
+                              extractor=extractor,
+                              districts=districts,
+                              closed_statuses=closed_statuses,
+                              dictionary_format=dictionary_format,
+                              spatial_reference=spatial_reference,
+                              project_geometry=False)
+    metrics = metrics or RunMetrics()
+    with metrics.stage('parse'):
+        ticket_dictionaries = _map_parse(parse, tickets_content, workers, executor, pool)
+    metrics.count('tickets_parsed', len(ticket_dictionaries))
+    if project:
+        _project_tickets(ticket_dictionaries, spatial_reference, metrics, simplify_tolerance, coordinate_precision)
+    return ticket_dictionaries
+
+def _project_tickets(ticket_dictionaries: list, spatial_reference: int, metrics: RunMetrics, simplify_tolerance: float | None = None, coordinate_precision: int | None = None) -> list:
+    """Project the [lat, lon] rings of parsed tickets in one batch and reduce them, in place."""
+    with metrics.stage('projection'):
+        projected_rings = convert_geometry_rings_batch([ticket['geometry']['rings'] for ticket in ticket_dictionaries], spatial_reference)
+    for ticket_dictionary, rings in zip(ticket_dictionaries, projected_rings):
+        ticket_dictionary['geometry']['rings'] = rings
+    _reduce_geometry(ticket_dictionaries, simplify_tolerance, coordinate_precision, metrics)
+    return ticket_dictionaries
+
+def _parse_pool(workers: int, executor: str):
+    """Create the parsing pool for `workers`, or a null context when parsing in the calling thread."""
+    if workers <= 1:
+        return contextlib.nullcontext()
+    if executor == 'process':
+        # Workers start on the first map, once pipeline threads run, so they must not be forked.
+        return concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    elif executor == 'thread':
+        return concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+    raise ValueError(f"Unknown parse executor '{executor}', expected 'process' or 'thread'.")
+
+def _map_parse(parse, tickets_content: list, workers: int, executor: str, pool: concurrent.futures.Executor | None = None) -> list:
+    """Apply `parse` to every ticket, in a pool when more than one worker is requested."""
+    if workers > 1 and len(tickets_content) > 1:
+        if pool is None:
+            with _parse_pool(workers, executor) as pool:
+                return _map_parse(parse, tickets_content, workers, executor, pool)
+        chunksize = max(1, len(tickets_content) // (workers * 4))
+        return list(pool.map(parse, tickets_content, chunksize=chunksize))
+    return [parse(ticket_content) for ticket_content in tickets_content]
+
+def _failure_count(report: dict) -> int:
+    """Number of failed edits and ticket lookups in a run report."""
+    return sum(value for name, value in report.get('counters', {}).items() if '.edit_failed_' in name or name.endswith('.lookup_errors'))
+
+def _batched(items, size: int):
+    """Yield lists of up to `size` consecutive items, consuming `items` lazily."""
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, max(1, size)))
+        if not batch:
+            return
+        yield batch
     
-def _stage_changes(ticket_dictionary: dict, layer: arcgis.features.FeatureLayer, adds: list, deletes: list, updates: list):
+def _stage_changes(ticket_dictionary: dict, ticket_index: dict, adds: list, deletes: list, updates: list, state: RunState | None = None, feature_class=None) -> str:
     """
     Stage changes for a ticket by determining whether it should be added, updated, or deleted in the feature layer.
 
@@ -212,13 +251,18 @@ def _stage_changes(ticket_dictionary: dict, layer: arcgis.features.FeatureLayer,
         ticket_dictionary (dict): A dictionary representing a ticket, which should contain:
             - 'attributes': A dictionary of feature attributes, including 'ticketNumber'.
             - 'geometry': A dictionary defining the feature's geometry.
-        layer (arcgis.features.FeatureLayer): The feature layer to check for the existence of the ticket.
+        ticket_index (dict): Mapping of ticket number to OBJECTID for the features already in the layer,
+            as built by `_build_ticket_index`.
+        adds (list): A list of `arcgis.features.Feature` objects to be added, appended to in place.
+        deletes (list): A list of `arcgis.features.Feature` objects to be deleted, appended to in place.
+        updates (list): A list of `arcgis.features.Feature` objects to be updated, appended to in place.
+        state (RunState, optional): Fingerprints from previous runs. When given, tickets already in
+            the layer whose content has not changed are not staged.
+        feature_class (type, optional): Class of the staged features, built from a geometry and
+            attributes. Defaults to `arcgis.features.Feature`.
 
     Returns:
-        tuple[list, list, list]: A tuple containing three lists:
-            - adds (list): A list of `arcgis.features.Feature` objects to be added.
-            - deletes (list): A list of `arcgis.features.Feature` objects to be deleted.
-            - updates (list): A list of `arcgis.features.Feature` objects to be updated.
+        str: The action taken for the ticket, one of 'add', 'update', 'unchanged' or 'duplicate'.
 
     Raises:
         KeyError: If 'ticketNumber' is not found in the 'attributes' of `ticket_dictionary`.
@@ -226,101 +270,161 @@ def _stage_changes(ticket_dictionary: dict, layer: arcgis.features.FeatureLayer,
 
     Notes:
         - The function checks if the feature already exists in any of the lists (`adds`, `deletes`, `updates`).
-        - If the feature exists in the layer (determined by `_ticket_exists`), it is added to the `updates` list.
+        - If the feature exists in the layer (determined by `ticket_index`) and its fingerprint matches the
+          one in `state`, it is skipped.
+        - If the feature exists in the layer otherwise, it is added to the `updates` list.
         - If the feature does not exist in the layer, it is added to the `adds` list.
         - The function uses a `try` block to handle exceptions and logs errors using `LOGGER`.
     """
+    if feature_class is None:
+        import arcgis
+        feature_class = arcgis.features.Feature
     try:
         ticket_number = ticket_dictionary['attributes']['ticketNumber']
         # Create feature
-        feature = arcgis.features.Feature(ticket_dictionary['geometry'], ticket_dictionary['attributes'])
+        feature = feature_class(ticket_dictionary['geometry'], ticket_dictionary['attributes'])
         
         if feature in adds or feature in deletes or feature in updates:
             LOGGER.info(f"Duplicate ticket '{ticket_number}' found.")
-        elif _ticket_exists(layer, ticket_number):
-            feature.attributes['OBJECTID'] = _object_id_from_ticket_number(feature.attributes['ticketNumber'], layer)
+            return 'duplicate'
+        
+        if state is not None:
+            fingerprint = ticket_fingerprint(ticket_dictionary)
+            if ticket_number in ticket_index and state.is_unchanged(ticket_number, fingerprint):
+                LOGGER.debug(f"Ticket '{ticket_number}' unchanged.")
+                return 'unchanged'
+            state.stage(ticket_number, fingerprint)
+        
+        if ticket_number in ticket_index:
+            feature.attributes['OBJECTID'] = ticket_index[ticket_number]
             updates.append(feature)
             LOGGER.info(f"Update ticket '{ticket_number}'.")
+            return 'update'
         else:
             adds.append(feature)
             LOGGER.info(f"Add ticket '{ticket_number}'.")
+            return 'add'
         
         
     except KeyError:
         LOGGER.exception(f"KeyError: 'ticketNumber' is missing from ticket dictionary.")
         raise
 
-def _ticket_exists(layer: arcgis.features.FeatureLayer, ticket_number: str) -> bool:
+def _query_ticket_numbers(layer: arcgis.features.FeatureLayer, where: str):
     """
-    Check if a ticket (feature) with the specified object_id exists in the given FeatureLayer.
+    Page through the features matching `where`, reading only `OBJECTID` and `ticketNumber`.
+
+    Args:
+        layer (FeatureLayer): The ArcGIS FeatureLayer object to query.
+        where (str): SQL where clause selecting the features.
+
+    Yields:
+        tuple[str, str]: Ticket number and OBJECTID of each feature with a ticket number.
+    """
+    page_size = layer.properties.get('maxRecordCount') or 1000
+    last_object_id = None
+    while True:
+        # Pages are keyed on OBJECTID, offsets would shift when features are edited meanwhile.
+        page_where = where if last_object_id is None else f"{where} AND OBJECTID > {last_object_id}"
+        result = layer.query(where=page_where,
+                             out_fields='OBJECTID,ticketNumber',
+                             return_geometry=False,
+                             order_by_fields='OBJECTID ASC',
+                             result_record_count=page_size,
+                             return_all_records=False)
+        for feature in result.features:
+            ticket_number = feature.attributes['ticketNumber']
+            if ticket_number is not None:
+                yield str(ticket_number), str(feature.attributes['OBJECTID'])
+        if len(result.features) < page_size:
+            break
+        last_object_id = result.features[-1].attributes['OBJECTID']
+
+def _build_ticket_index(layer: arcgis.features.FeatureLayer) -> dict:
+    """
+    Build a ticket number to OBJECTID index for every feature in the layer.
+
+    The layer is read page by page with only the `OBJECTID` and `ticketNumber` fields and no
+    geometry, so a run needs a handful of requests instead of two queries per ticket.
 
     Args:
         layer (FeatureLayer): The ArcGIS FeatureLayer object to query.
-        object_id (str): The ID of the feature to check for existence.
 
     Returns:
-        bool: True if the feature exists, False otherwise.
+        dict: Mapping of ticket number (str) to OBJECTID (str).
     """
-    try:
-        # Query the FeatureLayer for the specific object_id
-        query = f"ticketNumber = {ticket_number}"
-        result = layer.query(where=query, return_count_only=True)
-
-        # Check if the feature count is greater than 0
-        return result > 0
-    except Exception as e:
-        # Log the error or handle it as needed
-        LOGGER.exception(f"Error querying FeatureLayer for ticket number {ticket_number}.")
-        return False
-
-def _object_id_from_ticket_number(ticket_number: str | int, layer: arcgis.features.FeatureLayer) -> str:
+    ticket_index = dict(_query_ticket_numbers(layer, '1=1'))
+    LOGGER.debug(f"Indexed {len(ticket_index)} tickets from the layer.")
+    return ticket_index
+
+def _remaining_open_tickets(layer: arcgis.features.FeatureLayer, edited_tickets: list) -> list:
     """
-    Convert a ticket number (which can be a string or an integer) to an object ID.
+    Get the open tickets in the layer that were not edited from the ticket page.
+
+    The open tickets are read with `_query_ticket_numbers` and the edited tickets are removed
+    locally, so the where clause stays the same size however many tickets were edited.
 
     Args:
-        ticket_number (str | int): The ticket number to convert.
         layer (FeatureLayer): The ArcGIS FeatureLayer object to query.
+        edited_tickets (list): Ticket numbers already processed in this run.
 
     Returns:
-        str: The corresponding object ID.
+        list: Ticket numbers of the remaining open tickets.
+    """
+    edited_tickets = {str(ticket_number) for ticket_number in edited_tickets}
+    return [ticket_number for ticket_number, _ in _query_ticket_numbers(layer, "status = 'OPEN'") if ticket_number not in edited_tickets]
 
-    Raises:
-        ValueError: If ticket_number cannot be processed into a valid object ID.
+def _update_ticket_index(ticket_index: dict, adds: list, add_results: list):
     """
-    try:
-        # Ensure ticket_number is a string
-        if isinstance(ticket_number, int):
-            ticket_number = str(ticket_number)
-        elif not isinstance(ticket_number, str) and not isinstance(ticket_number, int):
-            raise TypeError("ticket_number must be a string or integer.")
-        
-        # Validate the ticket_number format (if needed)
-        if not ticket_number.isdigit():
-            raise ValueError("ticket_number must contain only digits.")
-        
-        # Query the FeatureLayer for the object ID
-        query = f"ticketNumber = '{ticket_number}'"  # Replace 'ticket_number_field' with the actual field name in your layer
-        result = layer.query(where=query, return_fields="OBJECTID", return_count_only=False)
-
-        # Check if any features are found
-        if result.features:
-            # Assuming the first feature contains the object ID
-            object_id = result.features[0].attributes["OBJECTID"]
-            return str(object_id)
-        else:
-            raise ValueError(f"No object found for ticket number '{ticket_number}'.")
+    Record the OBJECTIDs assigned to newly added features in the ticket index.
 
-    except (TypeError, ValueError) as e:
-        LOGGER.exception(f"An error occurred getting the object ID for ticket '{ticket_number}': {e}")
-        raise
-    except Exception as e:
-        LOGGER.exception(f"An unexpected error occurred: {e}")
-        raise
+    Args:
+        ticket_index (dict): Index built by `_build_ticket_index`, updated in place.
+        adds (list): The features sent as adds, in the order they were sent.
+        add_results (list): The `addResults` returned by `edit_features`.
+    """
+    for feature, add_result in zip(adds, add_results):
+        if add_result.get('success'):
+            ticket_index[str(feature.attributes['ticketNumber'])] = str(add_result['objectId'])
+
+def _successful_tickets(features: list, edit_results: list) -> list:
+    """
+    Get the ticket numbers of the features whose edit succeeded.
+
+    Args:
+        features (list): The features sent to `edit_features`, in the order they were sent.
+        edit_results (list): The matching `addResults` or `updateResults`.
 
+    Returns:
+        list: Ticket numbers of the successful edits.
+    """
+    return [feature.attributes['ticketNumber'] for feature, edit_result in zip(features, edit_results) if edit_result.get('success')]
+
+def _format_edit_summary(summary: EditSummary | dict) -> str:
+    """Format an edit summary, or the counts of `EditSummary.as_dict`, for the run log."""
+    counts = summary.as_dict() if isinstance(summary, EditSummary) else summary
+    return (f"adds: {counts['adds']}, updates: {counts['updates']}, deletes: {counts['deletes']}, "
+            f"failed: {counts['failed_adds'] + counts['failed_updates'] + counts['failed_deletes']}, "
+            f"batches: {counts['batches']}, retries: {counts['retries']}")
+
+
+def _feature_template(spatial_reference: dict) -> dict:
+    """Feature dictionary template for a layer in `spatial_reference`, as found in the layer extent."""
+    return {
+        'attributes': None,
+        'geometry': {
+            "rings": None,
+            "spatialReference": {
+                # Example WKID for Web Mercator (WGS84)
+                "wkid": spatial_reference['wkid'],
+                "latestWkid": spatial_reference.get('latestWkid', spatial_reference['wkid'])
+            }
+        }
+    }
 
 
 class OcGisApp:
-    def __init__(self, arcgis_username: str, arcgis_password: str, arcgis_link: str, layer_url: str, onecall_username: str, onecall_password: str, onecall_login_url: str, districts: list, driver_executable_path: str, update_range: int, state: str, headless=False, closed_statuses=["Closed, Marked"]):
+    def __init__(self, arcgis_username: str, arcgis_password: str, arcgis_link: str, layer_url: str, onecall_username: str, onecall_password: str, onecall_login_url: str, districts: list, driver_executable_path: str, update_range: int, state: str, headless=False, closed_statuses=["Closed, Marked"], parse_workers: int = 1, parse_executor: str = 'process', state_path: str | None = None, edit_batch_size: int = 500, edit_batch_bytes: int | None = None, edit_workers: int = 1, edit_retries: int = 3, lookup_workers: int = 1, lookup_interval: float = 0.0, fetch_backend: str = 'webdriver', metrics_path: str | None = None, metrics_format: str = 'jsonl', cache_path: str | None = None, cache_ttl: float = 3600, cache_max_bytes: int = 256 * 1024 * 1024, replay_path: str | None = None, layer=None, stream_batch_size: int = 500, simplify_tolerance: float | None = None, coordinate_precision: int | None = None, pipeline_depth: int = 2, gis=None, fetcher_factory=None):
         self.arcgis_username = arcgis_username
         self.arcgis_password = arcgis_password
         self.arcgis_link = arcgis_link
@@ -334,7 +438,34 @@ class OcGisApp:
         self.state = state
         self.headless = headless
         self.driver_executable_path = driver_executable_path
-        self._setup()
+        self.parse_workers = parse_workers
+        self.parse_executor = parse_executor
+        self.state_path = state_path
+        self.edit_batch_size = edit_batch_size
+        self.edit_batch_bytes = edit_batch_bytes
+        self.edit_workers = edit_workers
+        self.edit_retries = edit_retries
+        self.lookup_workers = lookup_workers
+        self.lookup_interval = lookup_interval
+        self.fetch_backend = fetch_backend
+        self.replay_path = replay_path
+        self.metrics_path = metrics_path
+        self.metrics_format = metrics_format
+        self._layer = layer
+        self.stream_batch_size = stream_batch_size
+        self.simplify_tolerance = simplify_tolerance
+        self.coordinate_precision = coordinate_precision
+        self.pipeline_depth = pipeline_depth
+        self.fetcher_factory = fetcher_factory
+        self._gis = gis
+        self.extractor = TicketExtractor(NEW_ATTRIBUTE_MAP)
+        self.run_state = RunState(state_path) if state_path else None
+        self.page_cache = TicketPageCache(cache_path, ttl=cache_ttl, max_bytes=cache_max_bytes) if cache_path else None
+        self.fetcher = None
+        self._keep_sessions = False
+        self.gis = None
+        self._feature_layer = None
+        self._feature_class = None
     
       
         
@@ -342,78 +473,362 @@ class OcGisApp:
     def _setup(self):
         
         # ----- Set up arcgis -----
-        self.gis = arcgis.GIS(self.arcgis_link, self.arcgis_username, self.arcgis_password)
-        self.layer = arcgis.features.FeatureLayer(self.layer_url, self.gis)
-        self.spatial_reference = self.layer.properties['extent']['spatialReference']['wkid']
-        self.feature_dictionary = {
-            'attributes': None,
-            'geometry': {
-                "rings": None,
-                "spatialReference": {
-                    # Example WKID for Web Mercator (WGS84)
-                    "wkid": self.spatial_reference,
-                    "latestWkid": self.layer.properties['extent']['spatialReference']['latestWkid']
-                }
-            }
-        }
+        if self._layer is None:
+            import arcgis
+            # A shared connection may be given, e.g. by `ocgis.runner.FanOutRunner`.
+            self.gis = self._gis if self._gis is not None else arcgis.GIS(self.arcgis_link, self.arcgis_username, self.arcgis_password)
+            layer = arcgis.features.FeatureLayer(self.layer_url, self.gis)
+        else:
+            # A layer object was given, e.g. a FakeFeatureLayer for replays, no login needed.
+            self.gis = None
+            layer = self._layer
+        self._spatial_reference = layer.properties['extent']['spatialReference']['wkid']
+        self._feature_dictionary = _feature_template(layer.properties['extent']['spatialReference'])
+        # Layers other than arcgis' may stage their own features, e.g. FakeFeatureLayer.
+        self._feature_class = getattr(layer, 'feature_class', None)
+        self._feature_layer = layer
         
+    def _connect(self):
+        """Log in to ArcGIS on first use instead of when the app is created."""
+        if self._feature_layer is None:
+            self._setup()
+    
+    @property
+    def layer(self):
+        """The feature layer written to, logging in to ArcGIS on first use."""
+        self._connect()
+        return self._feature_layer
+    
+    @property
+    def spatial_reference(self) -> int:
+        """WKID of the feature layer."""
+        self._connect()
+        return self._spatial_reference
+    
+    @property
+    def feature_dictionary(self) -> dict:
+        """Template of the feature dictionaries written to the layer."""
+        self._connect()
+        return self._feature_dictionary
         
         
+    def _create_fetcher(self) -> TicketFetcher:
+        if self.fetcher_factory is not None:
+            return self.fetcher_factory()
+        return self._create_backend_fetcher()
         
-    def run(self):
-        LOGGER.info('Start run.')
+    def _create_backend_fetcher(self) -> TicketFetcher:
+        if self.fetch_backend == 'webdriver':
+            return WebdriverFetcher(username=self.onecall_username,
+                                    password=self.onecall_password,
+                                    login_url=self.onecall_login_url,
+                                    driver_executable_path=self.driver_executable_path,
+                                    headless=self.headless)
+        elif self.fetch_backend == 'http':
+            return HttpFetcher(username=self.onecall_username,
+                               password=self.onecall_password,
+                               login_url=self.onecall_login_url)
+        elif self.fetch_backend == 'replay':
+            return ReplayFetcher(self.replay_path)
+        raise ValueError(f"Unknown fetch backend '{self.fetch_backend}', expected 'webdriver', 'http' or 'replay'.")
         
-        # ----- Set up webdriver -----
-        driver_options = Options()
-        if self.headless:
-            driver_options.add_argument('--headless')
-        driver_options.add_argument('--log-level=3')
-        driver_options.add_argument(
-            'user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
-        #driver_options.add_argument("--kiosk-printing")
-        driver_service = Service(executable_path=self.driver_executable_path)
-        self.webdriver = webdriver.Edge(options=driver_options,
-                                service=driver_service, keep_alive=True)
-        self.webdriver.implicitly_wait(20)
+    @classmethod
+    def replay(cls, replay_path: str, layer, districts: list, state: str = 'IA', update_range: int = 30, closed_statuses=["Closed, Marked"], **options):
+        """Create an app that reads recorded pages from `replay_path` and writes to `layer`.
+
+        No One Call or ArcGIS login happens, see `ocgis.replay` for the replay directory layout
+        and an in-memory `FakeFeatureLayer`.
+        """
+        return cls(arcgis_username=None, arcgis_password=None, arcgis_link=None, layer_url=None,
+                   onecall_username=None, onecall_password=None, onecall_login_url=None,
+                   districts=districts, driver_executable_path=None, update_range=update_range, state=state,
+                   closed_statuses=closed_statuses, fetch_backend='replay', replay_path=replay_path, layer=layer, **options)
+    
+    def _cache_page(self, html_content: str, ticket_dictionary: dict):
+        """Store a ticket page in the page cache, flagged final when the ticket is closed."""
+        if self.page_cache is not None:
+            self.page_cache.put(ticket_dictionary['attributes']['ticketNumber'], html_content, final=ticket_dictionary['attributes']['status'] == 'CLOSED')
+    
+    def parse_cached(self, ticket_numbers: list | None = None, spatial_reference: int | None = None) -> list:
+        """Parse cached ticket pages without contacting One Call.
+
+        Useful to check the output of an attribute map change against pages already seen.
+
+        Args:
+            ticket_numbers (list, optional): Tickets to parse, defaults to every cached ticket.
+            spatial_reference (int, optional): WKID to project the rings to. Defaults to the
+                feature layer's, which logs in to ArcGIS when the app is not connected yet.
+
+        Returns:
+            list: Feature dictionaries of the cached tickets that were found.
+        """
+        if self.page_cache is None:
+            raise ValueError("No cache_path configured.")
+        if ticket_numbers is None:
+            ticket_numbers = self.page_cache.ticket_numbers()
+        if spatial_reference is None:
+            spatial_reference, dictionary_format = self.spatial_reference, self.feature_dictionary
+        else:
+            dictionary_format = _feature_template({'wkid': spatial_reference})
+        pages = [page for page in map(self.page_cache.read, ticket_numbers) if page is not None]
+        return _parse_tickets(tickets_content=pages,
+                              extractor=self.extractor,
+                              districts=self.districts,
+                              closed_statuses=self.closed_statuses,
+                              dictionary_format=dictionary_format,
+                              spatial_reference=spatial_reference,
+                              workers=self.parse_workers,
+                              executor=self.parse_executor,
+                              simplify_tolerance=self.simplify_tolerance,
+                              coordinate_precision=self.coordinate_precision)
         
-        # ----- Get current list from locator page -----
+    def close(self):
+        """Close the One Call session kept open between runs."""
+        if self.fetcher is not None:
+            self.fetcher.close()
+            self.fetcher = None
         
-        tickets_page_content = _website_navigation(driver=self.webdriver, username=self.onecall_username, password=self.onecall_password, login_url=self.onecall_login_url, update_range=self.update_range)
-        # maybe convert to a needed data type here
-        tickets_content = tickets_page_content.split('<h1 style="text-align:center;">Iowa One Call</h1>')[1:]
+    def _create_writer(self, layer) -> EditWriter:
+        return EditWriter(layer,
+                          max_features=self.edit_batch_size,
+                          max_bytes=self.edit_batch_bytes,
+                          max_workers=self.edit_workers,
+                          max_retries=self.edit_retries)
+    
+    def _parse_batch(self, batch: tuple, pool, metrics: RunMetrics) -> tuple:
+        """Pipeline stage parsing a batch of `(html, fetched)` pages, see `run`."""
+        phase, pages = batch
+        ticket_dictionaries = _parse_tickets(tickets_content=[html_content for html_content, _ in pages],
+                                             extractor=self.extractor,
+                                             districts=self.districts,
+                                             closed_statuses=self.closed_statuses,
+                                             dictionary_format=self.feature_dictionary,
+                                             spatial_reference=self.spatial_reference,
+                                             workers=self.parse_workers,
+                                             executor=self.parse_executor,
+                                             metrics=metrics,
+                                             pool=pool,
+                                             project=False)
+        return phase, pages, ticket_dictionaries
+    
+    def _project_batch(self, batch: tuple, metrics: RunMetrics) -> tuple:
+        """Pipeline stage projecting and reducing the rings of a parsed batch."""
+        phase, pages, ticket_dictionaries = batch
+        _project_tickets(ticket_dictionaries, self.spatial_reference, metrics, self.simplify_tolerance, self.coordinate_precision)
+        return phase, pages, ticket_dictionaries
+    
+    def _stage_batch(self, batch: tuple, ticket_index: dict, edited_tickets: set, metrics: RunMetrics) -> tuple:
+        """Pipeline stage caching fetched pages and staging the edits of a batch.
+
+        Tickets already staged in this run are skipped, since the adds of an earlier batch may
+        still be in flight and missing from `ticket_index`.
+        """
+        phase, pages, ticket_dictionaries = batch
+        if phase == 'site':
+            metrics.count('site.tickets', len(pages))
+        actions = Counter()
+        adds, deletes, updates = [], [], []
+        with metrics.stage(f'{phase}.stage'):
+            for (html_content, fetched), ticket_dictionary in zip(pages, ticket_dictionaries):
+                ticket_number = ticket_dictionary['attributes']['ticketNumber']
+                if ticket_number in edited_tickets:
+                    LOGGER.info(f"Duplicate ticket '{ticket_number}' found.")
+                    actions['duplicate'] += 1
+                    continue
+                edited_tickets.add(ticket_number)
+                if fetched:
+                    self._cache_page(html_content, ticket_dictionary)
+                actions[_stage_changes(ticket_dictionary, ticket_index, adds, deletes, updates, self.run_state, self._feature_class)] += 1
+        return phase, adds, deletes, updates, actions
+    
+    def _recheck_pages(self, ticket_numbers: list, fetcher: MeteredFetcher, metrics: RunMetrics):
+        """Yield `(html, fetched)` for the remaining open tickets, from the cache or looked up.
+
+        Final and recently fetched tickets are read from the cache instead of being looked up.
+        The fetcher from the first phase is already logged in and becomes the first lookup worker.
+        """
+        if self.page_cache is not None:
+            cached_pages = {ticket_number: self.page_cache.get(ticket_number) for ticket_number in ticket_numbers}
+            ticket_numbers = [ticket_number for ticket_number, page in cached_pages.items() if page is None]
+            metrics.count('open.cache_hits', len(cached_pages) - len(ticket_numbers))
+            LOGGER.debug(f"Open tickets served from cache: {len(cached_pages) - len(ticket_numbers)}.")
+            for html_content in cached_pages.values():
+                if html_content is not None:
+                    yield html_content, False
+        lookup_pool = WorkerPool(lambda: MeteredFetcher(self._create_fetcher(), metrics),
+                                 size=self.lookup_workers,
+                                 min_interval=self.lookup_interval,
+                                 close=lambda fetcher: fetcher.close(),
+                                 workers=[fetcher])
+        with lookup_pool, metrics.stage('open.lookups'):
+            lookups = lookup_pool.imap_unordered(lambda fetcher, ticket_number: fetcher.lookup_ticket(ticket_number, self.state), ticket_numbers)
+            for ticket_number, html_content, error in lookups:
+                if error is not None:
+                    metrics.count('open.lookup_errors')
+                    LOGGER.error(f"Lookup failed for ticket '{ticket_number}': {error}")
+                    continue
+                yield html_content, True
+    
+    def _write(self, phase: str, writer: EditWriter, ticket_index: dict, adds: list, deletes: list, updates: list, actions: Counter, metrics: RunMetrics):
+        """Write the staged edits of a phase and record their outcome."""
+        with metrics.stage(f'{phase}.edit'):
+            result = writer.write(adds=adds, updates=updates, deletes=deletes)
+        _update_ticket_index(ticket_index, adds, result.add_results)
+        if self.run_state is not None:
+            self.run_state.commit(_successful_tickets(adds, result.add_results) + _successful_tickets(updates, result.update_results))
+        for action, count in actions.items():
+            metrics.count(f'{phase}.{action}', count)
+        for name, value in result.as_dict().items():
+            metrics.count(f'{phase}.edit_{name}', value)
+        LOGGER.debug(f"{phase.capitalize()} batch edit results: {_format_edit_summary(result)}, unchanged: {actions['unchanged']}")
+        adds.clear()
+        deletes.clear()
+        updates.clear()
+        actions.clear()
+    
+    def _log_phase(self, phase: str, metrics: RunMetrics):
+        """Log the edit results of every batch written in a phase."""
+        counters = metrics.report()['counters']
+        counts = {name: counters.get(f'{phase}.edit_{name}', 0) for name in EditSummary().as_dict()}
+        LOGGER.info(f"{phase.capitalize()} edit results: {_format_edit_summary(counts)}, unchanged: {counters.get(f'{phase}.unchanged', 0)}")
+    
+    def _finish_run(self, metrics: RunMetrics) -> dict:
+        if self.run_state is not None:
+            self.run_state.save()
+        if self.page_cache is not None:
+            self.page_cache.save()
+        if not self._keep_sessions:
+            self.close()
+        report = metrics.report()
+        if self.metrics_path:
+            try:
+                write_report(self.metrics_path, report, self.metrics_format)
+            except Exception:
+                LOGGER.exception(f"Could not write run metrics to '{self.metrics_path}'.")
+        counters = report['counters']
+        if counters.get('geometry.vertices_in'):
+            LOGGER.info(f"Geometry reduced from {counters['geometry.vertices_in']} to {counters['geometry.vertices_out']} vertices "
+                        f"and from {counters['geometry.bytes_in']} to {counters['geometry.bytes_out']} bytes.")
+        LOGGER.info(f"End run in {report['duration']:.1f}s.")
+        return report
+    
+    def run(self, update_range: int | None = None, recheck_open: bool = True) -> dict:
+        """Pull tickets from One Call and write them to the feature layer once.
+
+        Args:
+            update_range (int, optional): Days to look back, defaults to the configured `update_range`.
+            recheck_open (bool): Whether to look up the open tickets outside of the update range.
+
+        Returns:
+            dict: Report of the run with the wall time and number of calls of each stage and
+            counters for tickets, REST requests and bytes fetched, see `RunMetrics.report`.
+        """
+        LOGGER.info('Start run.')
+        metrics = RunMetrics()
+        if update_range is None:
+            update_range = self.update_range
+        layer = MeteredLayer(self.layer, metrics)
+        writer = self._create_writer(layer)
         
+        # ----- Set up fetcher -----
+        if self.fetcher is None:
+            self.fetcher = self._create_fetcher()
+        fetcher = MeteredFetcher(self.fetcher, metrics)
         
-        edited_tickets = []
-        adds, deletes, updates = [], [], []
-        for ticket_content in tickets_content:
-            ticket_dictionary = _content_parsing(html_content=ticket_content, 
-                                                 attribute_map=NEW_ATTRIBUTE_MAP, 
-                                                 districts=self.districts, 
-                                                 dictionary_format=self.feature_dictionary,
-                                                 spatial_reference=self.spatial_reference,
-                                                 closed_statuses=self.closed_statuses)
-            edited_tickets.append(ticket_dictionary['attributes']['ticketNumber'])
-            _stage_changes(ticket_dictionary=ticket_dictionary, layer=self.layer, adds=adds, deletes=deletes, updates=updates)
-        result = self.layer.edit_features(adds=adds, updates=updates, deletes=deletes)
-        LOGGER.info(f"Site edit results: adds: {len(result['addResults'])}, updates: {len(result['updateResults'])}, deletes: {len(result['deleteResults'])}")
-
-        # ----- Check remaining open tickets -----
+        with metrics.stage('index'):
+            ticket_index = _build_ticket_index(layer)
         
-        # Construct the WHERE clause
-        excluded_ticket_numbers_str = "', '".join(edited_tickets)
-        where_clause = f"status = 'OPEN' AND ticketNumber NOT IN ('{excluded_ticket_numbers_str}')"
+        # ----- Pipeline -----
+        # Each phase is a chain of fetch -> parse -> project -> stage threads feeding one write
+        # thread through bounded queues, so at most `pipeline_depth` batches wait between two
+        # stages. The open ticket re-check starts as soon as the locator page is staged, while
+        # its last batches are still being written.
         
-        remaining_open_tickets = self.layer.query(where=where_clause)
-        LOGGER.debug(f"Remaining open tickets: {len(remaining_open_tickets)}.")
+        edited_tickets = set()
+        with _parse_pool(self.parse_workers, self.parse_executor) as pool, Pipeline(self.pipeline_depth) as pipeline:
+            staged = pipeline.new_queue()
+            pipeline.sink('write', lambda batch: self._write(batch[0], writer, ticket_index, *batch[1:], metrics), staged, producers=2 if recheck_open else 1)
+            
+            def chain(phase, pages):
+                fetched, parsed, projected = pipeline.new_queue(), pipeline.new_queue(), pipeline.new_queue()
+                pipeline.source(f'{phase}-fetch', ((phase, batch) for batch in _batched(pages, self.stream_batch_size)), fetched)
+                pipeline.stage(f'{phase}-parse', lambda batch: self._parse_batch(batch, pool, metrics), fetched, parsed)
+                pipeline.stage(f'{phase}-project', lambda batch: self._project_batch(batch, metrics), parsed, projected)
+                return pipeline.stage(f'{phase}-stage', lambda batch: self._stage_batch(batch, ticket_index, edited_tickets, metrics), projected, staged)
+            
+            # ----- Get current list from locator page -----
+            site_pages = ((html_content, True) for html_content in fetcher.iter_tickets(update_range))
+            pipeline.wait(chain('site', site_pages))
+            
+            # ----- Check remaining open tickets -----
+            if recheck_open:
+                with metrics.stage('open.snapshot'):
+                    ticket_numbers = _remaining_open_tickets(layer, edited_tickets)
+                metrics.count('open.tickets', len(ticket_numbers))
+                LOGGER.debug(f"Remaining open tickets: {len(ticket_numbers)}.")
+                chain('open', self._recheck_pages(ticket_numbers, fetcher, metrics))
+            pipeline.join()
         
-        adds, deletes, updates = [], [], []
-        for ticket in remaining_open_tickets.features:
-            ticket_number = ticket.attributes['ticketNumber']
-            html_content = _single_ticket_lookup(self.webdriver, ticket_number, self.state)
-            ticket_dictionary = _content_parsing(html_content, NEW_ATTRIBUTE_MAP, self.districts, self.closed_statuses, self.feature_dictionary, self.spatial_reference)
-            _stage_changes(ticket_dictionary, self.layer, adds, deletes, updates)
-        result = self.layer.edit_features(adds, updates, deletes)
-        LOGGER.info(f"Open edit results: adds: {len(result['addResults'])}, updates: {len(result['updateResults'])}, deletes: {len(result['deleteResults'])}")
-        self.webdriver.quit()
-        LOGGER.info('End run.')
+        self._log_phase('site', metrics)
+        if recheck_open:
+            self._log_phase('open', metrics)
+        return self._finish_run(metrics)
+        
+    def serve(self, interval: float, full_sweep_interval: float = 86400, max_cycles: int | None = None):
+        """Run continuously, keeping the ArcGIS and One Call sessions open between cycles.
+
+        Each cycle only searches the audit window since the start of the last successful cycle
+        (the watermark). A full `update_range` sweep, including the re-check of open tickets
+        outside the window, runs when no full sweep was recorded and then every
+        `full_sweep_interval` seconds. A cycle whose edits or lookups partly failed is not
+        successful, so its window is searched again by the next cycle. The watermark is
+        persisted in the state file when `state_path` is set. After a failed cycle both
+        sessions are re-established before the next one.
+
+        Args:
+            interval (float): Seconds between the start of two cycles.
+            full_sweep_interval (float): Seconds between two full window sweeps.
+            max_cycles (int, optional): Stop after this many cycles, runs forever by default.
+        """
+        state = self.run_state if self.run_state is not None else RunState(None)
+        self._keep_sessions = True
+        cycles = 0
+        try:
+            while max_cycles is None or cycles < max_cycles:
+                cycle_start = datetime.now()
+                full_sweep = (state.watermark is None or state.last_full_sweep is None
+                              or (cycle_start - state.last_full_sweep).total_seconds() >= full_sweep_interval)
+                if full_sweep:
+                    update_range = self.update_range
+                else:
+                    update_range = min(self.update_range, (cycle_start.date() - state.watermark.date()).days)
+                LOGGER.info(f"Start {'full' if full_sweep else 'incremental'} cycle, looking back {update_range} days.")
+                try:
+                    report = self.run(update_range=update_range, recheck_open=full_sweep)
+                except Exception:
+                    LOGGER.exception("Cycle failed, re-establishing sessions.")
+                    self._reconnect()
+                else:
+                    failures = _failure_count(report)
+                    if failures:
+                        # Keep the watermark so the next cycle searches these tickets again.
+                        LOGGER.warning(f"Cycle had {failures} failed edits or lookups, keeping the watermark.")
+                    else:
+                        state.watermark = cycle_start
+                        if full_sweep:
+                            state.last_full_sweep = cycle_start
+                        state.save()
+                cycles += 1
+                if max_cycles is not None and cycles >= max_cycles:
+                    break
+                time.sleep(max(0.0, interval - (datetime.now() - cycle_start).total_seconds()))
+        finally:
+            self._keep_sessions = False
+            self.close()
+            
+    def _reconnect(self):
+        """Drop the One Call and ArcGIS sessions, both are established again on next use."""
+        self.close()
+        self.gis = None
+        self._feature_layer = None
         
\ No newline at end of file
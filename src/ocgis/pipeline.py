@@ -0,0 +1,138 @@
+import logging
+import queue
+import threading
+
+LOGGER = logging.getLogger(__name__)
+
+_DONE = object()
+_POLL_INTERVAL = 0.1
+
+
+class _Stopped(Exception):
+    pass
+
+
+class Pipeline:
+    """
+    Stages running concurrently in their own threads and connected by bounded queues.
+
+    A source thread iterates items into a queue, each stage thread takes items from one queue,
+    applies its function and puts the result in the next, and a sink thread consumes the last
+    queue. Bounded queues keep at most `maxsize` items waiting between two stages, so a fast
+    stage blocks instead of piling up work in memory. Several chains can feed the same queue,
+    the sink then stops after receiving the end of each of its `producers`.
+
+    The first exception raised by any stage stops every thread and is raised again by `wait`
+    and `join`.
+
+    Args:
+        maxsize (int): Maximum number of items waiting in each queue.
+    """
+
+    def __init__(self, maxsize: int = 2):
+        self.maxsize = max(1, maxsize)
+        self._threads = []
+        self._error = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self._stopped.set()
+        for thread in self._threads:
+            thread.join()
+
+    def new_queue(self) -> queue.Queue:
+        """Create a bounded queue connecting two stages."""
+        return queue.Queue(maxsize=self.maxsize)
+
+    def _put(self, outbox: queue.Queue, item):
+        while True:
+            if self._stopped.is_set():
+                raise _Stopped()
+            try:
+                outbox.put(item, timeout=_POLL_INTERVAL)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, inbox: queue.Queue):
+        while True:
+            if self._stopped.is_set():
+                raise _Stopped()
+            try:
+                return inbox.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+
+    def _start(self, name: str, target) -> threading.Thread:
+        def run():
+            try:
+                target()
+            except _Stopped:
+                pass
+            except BaseException as e:
+                LOGGER.debug(f"Pipeline stage '{name}' failed: {e}")
+                with self._lock:
+                    if self._error is None:
+                        self._error = e
+                self._stopped.set()
+        thread = threading.Thread(target=run, name=f'ocgis-{name}', daemon=True)
+        self._threads.append(thread)
+        thread.start()
+        return thread
+
+    def source(self, name: str, items, outbox: queue.Queue) -> threading.Thread:
+        """Put every item of the iterable `items` in `outbox`, then its end."""
+        def target():
+            try:
+                for item in items:
+                    self._put(outbox, item)
+                self._put(outbox, _DONE)
+            finally:
+                if hasattr(items, 'close'):
+                    items.close()
+        return self._start(name, target)
+
+    def stage(self, name: str, function, inbox: queue.Queue, outbox: queue.Queue) -> threading.Thread:
+        """Put `function(item)` in `outbox` for every item of `inbox`, results that are None are dropped."""
+        def target():
+            while (item := self._get(inbox)) is not _DONE:
+                result = function(item)
+                if result is not None:
+                    self._put(outbox, result)
+            self._put(outbox, _DONE)
+        return self._start(name, target)
+
+    def sink(self, name: str, function, inbox: queue.Queue, producers: int = 1) -> threading.Thread:
+        """Call `function(item)` for every item of `inbox` until `producers` chains have ended."""
+        def target():
+            remaining = producers
+            while remaining:
+                item = self._get(inbox)
+                if item is _DONE:
+                    remaining -= 1
+                else:
+                    function(item)
+        return self._start(name, target)
+
+    def _raise(self):
+        if self._error is not None:
+            raise self._error
+
+    def wait(self, thread: threading.Thread):
+        """Wait for one stage to finish, raising the pipeline's error if a stage failed."""
+        while thread.is_alive() and not self._stopped.is_set():
+            thread.join(_POLL_INTERVAL)
+        self._raise()
+
+    def join(self):
+        """Wait for every stage to finish, raising the first error raised by a stage."""
+        for thread in self._threads:
+            self.wait(thread)
+        for thread in self._threads:
+            thread.join()
+        self._raise()
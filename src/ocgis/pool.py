@@ -0,0 +1,152 @@
+import concurrent.futures
+import itertools
+import logging
+import queue
+import threading
+import time
+
+LOGGER = logging.getLogger(__name__)
+
+
+class _Slot:
+    def __init__(self, worker=None):
+        self.worker = worker
+        self.last_used = 0.0
+        # Whether the worker has completed a task, a new worker failing usually could not log in.
+        self.proven = worker is not None
+
+
+class WorkerPool:
+    """
+    A bounded pool of long-lived workers, such as logged in browsers or sessions.
+
+    Workers are created lazily by `factory` the first time a slot is used, so logins happen
+    concurrently and only as many as the work needs. Each worker is used by one task at a
+    time and waits at least `min_interval` seconds between tasks. A worker whose task raised
+    is closed, or only dropped if it was borrowed, and recreated on its next use. After
+    `max_startup_failures` new workers in a row failed to be created or to complete their
+    first task, e.g. during an outage or with bad credentials, the remaining tasks fail
+    without creating more.
+
+    Args:
+        factory (callable): Creates a new ready to use worker.
+        size (int): Maximum number of workers.
+        min_interval (float): Minimum seconds between two tasks on the same worker.
+        close (callable, optional): Releases a worker when it is discarded or the pool closes.
+        workers (list, optional): Already created workers to use before creating new ones. They
+            are still owned by the caller and are not closed with the pool.
+        max_startup_failures (int): Consecutive failures of new workers after which the pool
+            stops creating workers.
+    """
+
+    def __init__(self, factory, size: int = 1, min_interval: float = 0.0, close=None, workers: list = None, max_startup_failures: int = 3):
+        self.factory = factory
+        self.size = max(1, size)
+        self.min_interval = min_interval
+        self._close = close
+        self.max_startup_failures = max(1, max_startup_failures)
+        self._startup_failures = 0
+        self._startup_error = None
+        self._slots = queue.Queue()
+        self._all_slots = []
+        self._lock = threading.Lock()
+        initial = list(workers or [])[:self.size]
+        self._borrowed = {id(worker) for worker in initial}
+        for worker in initial + [None] * (self.size - len(initial)):
+            slot = _Slot(worker)
+            self._all_slots.append(slot)
+            self._slots.put(slot)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _discard(self, worker):
+        if worker is not None and self._close is not None:
+            try:
+                self._close(worker)
+            except Exception:
+                LOGGER.exception("Error closing pool worker.")
+
+    def _record(self, slot: _Slot, error: Exception | None):
+        with self._lock:
+            if error is None:
+                slot.proven = True
+                self._startup_failures = 0
+            elif not slot.proven:
+                self._startup_failures += 1
+                self._startup_error = error
+
+    def _run(self, function, item):
+        slot = self._slots.get()
+        try:
+            with self._lock:
+                if self._startup_failures >= self.max_startup_failures:
+                    raise RuntimeError(f"Giving up after {self._startup_failures} new workers failed in a row.") from self._startup_error
+            if slot.worker is None:
+                try:
+                    slot.worker = self.factory()
+                except Exception as e:
+                    self._record(slot, e)
+                    raise
+                slot.proven = False
+            wait = slot.last_used + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                result = function(slot.worker, item)
+            except Exception as e:
+                self._record(slot, e)
+                # Borrowed workers are only dropped from the pool, the caller still owns them.
+                if id(slot.worker) not in self._borrowed:
+                    self._discard(slot.worker)
+                slot.worker = None
+                raise
+            finally:
+                slot.last_used = time.monotonic()
+            self._record(slot, None)
+            return result
+        finally:
+            self._slots.put(slot)
+
+    def imap_unordered(self, function, items):
+        """
+        Call `function(worker, item)` for every item and yield results as they complete.
+
+        At most `size` items are submitted ahead of the consumer, and closing the generator
+        cancels the items not started yet instead of waiting for them.
+
+        Yields:
+            tuple: `(item, result, error)` where `error` is the exception raised for the item,
+            or None when it succeeded.
+        """
+        items = iter(items)
+        futures = {}
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.size)
+        try:
+            while True:
+                for item in itertools.islice(items, self.size - len(futures)):
+                    futures[executor.submit(self._run, function, item)] = item
+                if not futures:
+                    break
+                done, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    item = futures.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        yield item, None, e
+                    else:
+                        yield item, result, None
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def close(self):
+        """Close every worker created by the pool."""
+        with self._lock:
+            for slot in self._all_slots:
+                if id(slot.worker) not in self._borrowed:
+                    self._discard(slot.worker)
+                slot.worker = None
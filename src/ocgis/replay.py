@@ -0,0 +1,263 @@
+import itertools
+import operator
+import os
+import random
+import re
+import threading
+
+from .fetchers import STREAM_BLOCK_SIZE, TICKET_SEPARATOR, TicketFetcher, iter_ticket_chunks
+
+PRINT_TICKETS_FILE = 'printTickets.html'
+TICKETS_DIRECTORY = 'tickets'
+
+_CONDITION = re.compile(r"""^\s*(?:
+    (?P<true>1\s*=\s*1)
+    |(?P<field>\w+)\s*(?P<operator><>|!=|>=|<=|=|>|<|NOT\s+IN|IN)\s*(?P<value>\(.*\)|'(?:[^']|'')*'|[-\d.]+)
+)\s*$""", re.IGNORECASE | re.VERBOSE | re.DOTALL)
+_LIST_VALUE = re.compile(r"'((?:[^']|'')*)'|([-\d.]+)")
+_COMPARISONS = {'>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le}
+
+
+def _sql_value(match) -> str:
+    quoted, number = match
+    return quoted.replace("''", "'") if quoted or not number else number
+
+
+def _where_predicate(where: str):
+    """
+    Convert the where clauses used by the app into a predicate on feature attributes.
+
+    Supports `1=1`, `field = value`, `field <> value`, `field IN (...)`, `field NOT IN (...)`
+    and `field > value` conditions joined with AND. Values are compared as strings, except by
+    `>`, `>=`, `<` and `<=` which compare numbers.
+
+    Raises:
+        ValueError: If the clause uses anything else.
+    """
+    conditions = []
+    for condition in re.split(r'\s+AND\s+', (where or '1=1').strip(), flags=re.IGNORECASE):
+        match = _CONDITION.match(condition)
+        if match is None:
+            raise ValueError(f"Unsupported where clause '{where}'.")
+        if match.group('true'):
+            continue
+        sql_operator = re.sub(r'\s+', ' ', match.group('operator').upper())
+        value = match.group('value')
+        if value.startswith('('):
+            values = {_sql_value(item) for item in _LIST_VALUE.findall(value)}
+        else:
+            values = {_sql_value(_LIST_VALUE.match(value).groups())}
+        conditions.append((match.group('field'), sql_operator, values))
+
+    def matches(value, sql_operator: str, values: set) -> bool:
+        if sql_operator in _COMPARISONS:
+            return value is not None and _COMPARISONS[sql_operator](float(value), float(next(iter(values))))
+        found = value is not None and str(value) in values
+        return found != (sql_operator in ('<>', '!=', 'NOT IN'))
+
+    def predicate(attributes: dict) -> bool:
+        return all(matches(attributes.get(field), sql_operator, values) for field, sql_operator, values in conditions)
+    return predicate
+
+
+class FakeFeature:
+    """Minimal stand in for `arcgis.features.Feature`."""
+
+    def __init__(self, geometry: dict | None, attributes: dict):
+        self.geometry = geometry
+        self.attributes = attributes
+
+    @property
+    def as_dict(self) -> dict:
+        return {'geometry': self.geometry, 'attributes': self.attributes}
+
+
+class FakeFeatureSet:
+    """Minimal stand in for `arcgis.features.FeatureSet`."""
+
+    def __init__(self, features: list):
+        self.features = features
+
+    def __len__(self):
+        return len(self.features)
+
+
+class FakeFeatureLayer:
+    """
+    In-memory feature layer supporting the `query` and `edit_features` calls made by the app.
+
+    Queries honour the where clauses the app builds, count only queries, field restriction,
+    geometry suppression and offset or OBJECTID based paging limited to `max_record_count`. Request counts
+    are kept in `query_count` and `edit_count`.
+
+    Args:
+        features (list, optional): Initial features as dictionaries with 'attributes' and
+            'geometry', OBJECTIDs are assigned when missing.
+        max_record_count (int): Maximum number of features returned by one query.
+        wkid (int): Spatial reference reported in the layer properties.
+    """
+
+    feature_class = FakeFeature
+
+    def __init__(self, features: list = None, max_record_count: int = 2000, wkid: int = 102100):
+        self.properties = {
+            'maxRecordCount': max_record_count,
+            'extent': {'spatialReference': {'wkid': wkid, 'latestWkid': 3857 if wkid == 102100 else wkid}},
+        }
+        self.features = {}
+        self.query_count = 0
+        self.edit_count = 0
+        self._object_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        for feature in features or []:
+            self._add(feature.get('geometry'), dict(feature['attributes']))
+
+    def _add(self, geometry, attributes) -> int:
+        object_id = attributes.get('OBJECTID') or next(self._object_ids)
+        attributes['OBJECTID'] = object_id
+        self.features[int(object_id)] = FakeFeature(geometry, attributes)
+        return object_id
+
+    def query(self, where: str = '1=1', out_fields: str = '*', return_geometry: bool = True, return_count_only: bool = False,
+              order_by_fields: str = None, result_offset: int = None, result_record_count: int = None, return_fields: str = None, **kwargs):
+        with self._lock:
+            self.query_count += 1
+            predicate = _where_predicate(where)
+            matches = [feature for object_id, feature in sorted(self.features.items()) if predicate(feature.attributes)]
+        if return_count_only:
+            return len(matches)
+        offset = result_offset or 0
+        limit = min(result_record_count or self.properties['maxRecordCount'], self.properties['maxRecordCount'])
+        fields = return_fields or out_fields or '*'
+        selected = []
+        for feature in matches[offset:offset + limit]:
+            attributes = feature.attributes
+            if fields != '*':
+                attributes = {field: attributes.get(field) for field in fields.split(',')}
+            selected.append(FakeFeature(feature.geometry if return_geometry else None, dict(attributes)))
+        return FakeFeatureSet(selected)
+
+    def edit_features(self, adds: list = None, updates: list = None, deletes=None, **kwargs) -> dict:
+        if isinstance(deletes, str):
+            deletes = [object_id for object_id in deletes.split(',') if object_id]
+        with self._lock:
+            self.edit_count += 1
+            add_results, update_results, delete_results = [], [], []
+            for feature in adds or []:
+                object_id = self._add(feature.geometry, dict(feature.attributes))
+                add_results.append({'objectId': object_id, 'success': True})
+            for feature in updates or []:
+                object_id = int(feature.attributes['OBJECTID'])
+                if object_id in self.features:
+                    self.features[object_id].attributes.update(feature.attributes)
+                    self.features[object_id].attributes['OBJECTID'] = object_id
+                    if feature.geometry:
+                        self.features[object_id].geometry = feature.geometry
+                    update_results.append({'objectId': object_id, 'success': True})
+                else:
+                    update_results.append({'objectId': object_id, 'success': False, 'error': {'code': 1019, 'description': 'Object is missing.'}})
+            for object_id in deletes or []:
+                success = self.features.pop(int(object_id), None) is not None
+                delete_results.append({'objectId': int(object_id), 'success': success})
+        return {'addResults': add_results, 'updateResults': update_results, 'deleteResults': delete_results}
+
+
+class ReplayFetcher(TicketFetcher):
+    """
+    Serves recorded ticket pages from disk instead of One Call.
+
+    The replay directory holds the recorded print tickets page as `printTickets.html` and the
+    single ticket pages as `tickets/<ticket number>.html`.
+
+    Args:
+        directory (str): The replay directory.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def fetch_tickets(self, update_range: int) -> str:
+        with open(os.path.join(self.directory, PRINT_TICKETS_FILE), 'r', encoding='utf-8') as page_file:
+            return page_file.read()
+
+    def iter_tickets(self, update_range: int):
+        with open(os.path.join(self.directory, PRINT_TICKETS_FILE), 'r', encoding='utf-8') as page_file:
+            yield from iter_ticket_chunks(iter(lambda: page_file.read(STREAM_BLOCK_SIZE), ''))
+
+    def lookup_ticket(self, ticket_number: str, state: str) -> str:
+        with open(os.path.join(self.directory, TICKETS_DIRECTORY, f'{ticket_number}.html'), 'r', encoding='utf-8') as page_file:
+            return page_file.read()
+
+
+# ----- Synthetic corpora -----
+
+def synthetic_ticket(ticket_number: int, statuses: dict, polygons: list) -> str:
+    """
+    Build a ticket in the markup of the print tickets page.
+
+    Args:
+        ticket_number (int): Ticket number.
+        statuses (dict): Status of each district code.
+        polygons (list): Polygons as lists of [lat, lon] points.
+
+    Returns:
+        str: Html of the ticket, starting with the ticket separator.
+    """
+    status_rows = ''.join(f'<tr><td>{district.upper()}</td><td>Company {district.upper()}</td><td>{status}</td></tr>' for district, status in statuses.items())
+    polygon_divs = ''.join(
+        f'<div class="pure-u-md-1-1"><b>Polygon {number}:</b></div>'
+        + ''.join(f'<div class="pure-u-md-1-3">({lat:.6f}, {lon:.6f})</div>' for lat, lon in points)
+        for number, points in enumerate(polygons, start=1)
+    )
+    return f'''{TICKET_SEPARATOR}
+<div class="pure-g">
+<div class="pure-u-1-2"><span>Ticket No:</span> <span>{ticket_number}</span></div>
+<div class="pure-u-1-2"><span>Original Call Date:</span> <span>06/03/24 08:15 AM</span></div>
+<div class="pure-u-1-2"><span>Type:</span> <span>NORMAL</span></div>
+<div class="pure-u-1-2"><span>Expiration Date:</span> <span>07/01/24</span></div>
+<div class="pure-u-1-2"><span>Caller Name:</span> <span>Pat Caller</span></div>
+<div class="pure-u-1-2"><span>Phone:</span> <span>(319) 555-0100</span></div>
+<div class="pure-u-1-2"><span>Excavator Name:</span> <span>Example Excavating</span></div>
+<div class="pure-u-1-2"><span>Phone:</span> <span>(319) 555-0101</span></div>
+<div class="pure-u-1-2"><span>Address:</span> <span>100 Main St, Cedar Falls, IA</span></div>
+<div class="pure-u-1-2"><span>Contact Email:</span> <span>crew@example.com</span></div>
+<div class="pure-u-1-2"><span>Beginning Work Date:</span> <span>06/06/24 08:15 AM</span></div>
+<div class="pure-u-1-2"><span>Type of Work:</span> <span>FIBER INSTALL</span></div>
+<div class="pure-u-1-2"><span>County:</span> <span>BLACK HAWK</span></div>
+<div class="pure-u-1-2"><span>City:</span> <span>CEDAR FALLS</span></div>
+<div class="pure-u-1-1"><span>Remarks:</span> <span>LOCATE ENTIRE   PROPERTY
+  INCLUDING EASEMENTS</span></div>
+<div class="pure-u-1-1"><span>Locates shall be completed no later than:</span> <span>06/05/24 08:15 AM</span></div>
+</div>
+<table><thead><tr><th>District</th><th>Company Name</th><th>Status</th></tr></thead>
+<tbody>{status_rows}</tbody></table>
+<div class="pure-g">{polygon_divs}</div>
+'''
+
+
+def synthetic_corpus(count: int, districts: list = ('cf1', 'cf2'), open_ratio: float = 0.5, vertices: int = 12, seed: int = 0) -> list:
+    """
+    Build `count` synthetic tickets with random statuses and polygons around Cedar Falls.
+
+    Returns:
+        list: Html of each ticket, see `synthetic_ticket`.
+    """
+    generator = random.Random(seed)
+    tickets = []
+    for offset in range(count):
+        statuses = {district: 'Open' if generator.random() < open_ratio else 'Marked' for district in districts}
+        lat, lon = 42.5 + generator.uniform(-0.1, 0.1), -92.45 + generator.uniform(-0.1, 0.1)
+        polygon = [[lat + generator.uniform(0, 0.002), lon + generator.uniform(0, 0.002)] for _ in range(vertices)]
+        tickets.append(synthetic_ticket(2400000000 + offset, statuses, [polygon]))
+    return tickets
+
+
+def write_corpus(directory: str, tickets: list):
+    """Write tickets as a replay directory readable by `ReplayFetcher`."""
+    os.makedirs(os.path.join(directory, TICKETS_DIRECTORY), exist_ok=True)
+    with open(os.path.join(directory, PRINT_TICKETS_FILE), 'w', encoding='utf-8') as page_file:
+        page_file.write('<html><body>' + ''.join(tickets) + '</body></html>')
+    for ticket in tickets:
+        ticket_number = re.search(r'<span>Ticket No:</span> <span>(\d+)</span>', ticket).group(1)
+        with open(os.path.join(directory, TICKETS_DIRECTORY, f'{ticket_number}.html'), 'w', encoding='utf-8') as page_file:
+            page_file.write(f'<html><body>{ticket}</body></html>')
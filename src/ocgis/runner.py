@@ -0,0 +1,294 @@
+import concurrent.futures
+import contextlib
+import logging
+import threading
+from dataclasses import dataclass
+
+from .fetchers import TicketFetcher
+
+LOGGER = logging.getLogger(__name__)
+
+
+class _Memo:
+    """
+    Thread safe memo where concurrent callers of the same key wait for the first call.
+
+    Failed calls are not remembered, so the next caller tries again.
+    """
+
+    def __init__(self):
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, function):
+        with self._lock:
+            future = self._futures.get(key)
+            owner = future is None
+            if owner:
+                future = self._futures[key] = concurrent.futures.Future()
+        if owner:
+            try:
+                future.set_result(function())
+            except BaseException as e:
+                with self._lock:
+                    del self._futures[key]
+                future.set_exception(e)
+        return future.result()
+
+    def discard(self, key):
+        """Forget the result of `key`, the next caller calls its function again."""
+        with self._lock:
+            self._futures.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._futures)
+
+
+class GisPool:
+    """One ArcGIS login per organization and username, shared by every app of a runner."""
+
+    def __init__(self):
+        self._connections = _Memo()
+
+    def get(self, link: str, username: str, password: str):
+        """Get the connection of `username` to `link`, logging in on first use."""
+        def login():
+            import arcgis
+            LOGGER.info(f"Log in to '{link}' as '{username}'.")
+            return arcgis.GIS(link, username, password)
+        return self._connections.get((link, username), login)
+
+
+class _Account:
+    """
+    A One Call account's sessions and the pages fetched with them for its tenants during one
+    runner run.
+
+    Up to `sessions` sessions are created on demand, each used by one call at a time, so the
+    account serves as many concurrent lookups as its most parallel tenant asks for. A page is
+    kept until every registered tenant has read it or finished its run.
+    """
+
+    def __init__(self, factory=None, sessions: int = 1):
+        self.factory = factory
+        self.sessions = max(1, sessions)
+        self.pages = _Memo()
+        self.tenants = set()
+        self._readers = {}
+        self._lock = threading.Lock()
+        self._idle = []
+        self._created = 0
+        self._available = threading.Condition()
+
+    def register(self, tenant, sessions: int = 1):
+        """Add a tenant whose reads pages are kept for, sizing the sessions to its lookup workers."""
+        with self._lock:
+            self.tenants.add(tenant)
+            self.sessions = max(self.sessions, sessions)
+
+    def release(self, tenant):
+        """Remove a tenant that finished, dropping the pages only it had left to read."""
+        with self._lock:
+            self.tenants.discard(tenant)
+            for key in [key for key, readers in self._readers.items() if readers >= self.tenants]:
+                self._evict(key)
+
+    @property
+    def shared(self) -> bool:
+        return len(self.tenants) > 1
+
+    def _evict(self, key):
+        del self._readers[key]
+        self.pages.discard(key)
+
+    def read(self, tenant, key, function):
+        """Get the page `key` with `call(function)` once for every tenant of the account."""
+        page = self.pages.get(key, lambda: self.call(function))
+        with self._lock:
+            readers = self._readers.setdefault(key, set())
+            readers.add(tenant)
+            if readers >= self.tenants:
+                self._evict(key)
+        return page
+
+    @contextlib.contextmanager
+    def _session(self):
+        with self._available:
+            while not self._idle and self._created >= self.sessions:
+                self._available.wait()
+            fetcher = self._idle.pop() if self._idle else None
+            if fetcher is None:
+                self._created += 1
+        failed = True
+        try:
+            if fetcher is None:
+                fetcher = self.factory()
+            yield fetcher
+            failed = False
+        except GeneratorExit:
+            # A stream closed early leaves the session usable.
+            failed = False
+            raise
+        finally:
+            if failed and fetcher is not None:
+                # Start a new session for the next call, as `WorkerPool` does.
+                self._close(fetcher)
+            with self._available:
+                if failed:
+                    self._created -= 1
+                else:
+                    self._idle.append(fetcher)
+                self._available.notify()
+
+    def call(self, function):
+        """Call `function(fetcher)` on one of the account's sessions."""
+        with self._session() as fetcher:
+            return function(fetcher)
+
+    def stream(self, function):
+        """Iterate `function(fetcher)` on one of the account's sessions, holding it until the end."""
+        with self._session() as fetcher:
+            yield from function(fetcher)
+
+    def _close(self, fetcher):
+        try:
+            fetcher.close()
+        except Exception:
+            LOGGER.exception("Error closing One Call session.")
+
+    def close(self):
+        with self._available:
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+        for fetcher in idle:
+            self._close(fetcher)
+
+
+class SharedFetcher(TicketFetcher):
+    """
+    Fetcher of one app backed by the sessions of a One Call account shared with other apps.
+
+    Pages fetched for one app are reused by the others, each ticket page and print tickets
+    page is fetched at most once per account and run while another tenant still needs it.
+    The shared sessions are closed by the runner, closing this fetcher does nothing.
+
+    Args:
+        account (_Account): Account of the app's One Call credentials.
+        tenant: Identity of the app, registered with the account.
+    """
+
+    def __init__(self, account: _Account, tenant):
+        self.account = account
+        self.tenant = tenant
+
+    def fetch_tickets(self, update_range: int) -> str:
+        return self.account.read(self.tenant, ('page', update_range), lambda fetcher: fetcher.fetch_tickets(update_range))
+
+    def iter_tickets(self, update_range: int):
+        if not self.account.shared:
+            return self.account.stream(lambda fetcher: fetcher.iter_tickets(update_range))
+        # The tickets are kept for the other apps, so the page is not streamed.
+        return iter(self.account.read(self.tenant, ('tickets', update_range), lambda fetcher: list(fetcher.iter_tickets(update_range))))
+
+    def lookup_ticket(self, ticket_number: str, state: str) -> str:
+        return self.account.read(self.tenant, ('ticket', str(ticket_number), state), lambda fetcher: fetcher.lookup_ticket(ticket_number, state))
+
+    def close(self):
+        pass
+
+
+@dataclass
+class TenantResult:
+    """Outcome of one configuration of a `FanOutRunner` run, the run report or the error raised."""
+    name: str
+    report: dict | None = None
+    error: BaseException | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _account_key(options: dict) -> tuple:
+    if options.get('fetch_backend') == 'replay':
+        return 'replay', options.get('replay_path')
+    return options.get('fetch_backend', 'webdriver'), options.get('onecall_login_url'), options.get('onecall_username')
+
+
+class FanOutRunner:
+    """
+    Run several app configurations concurrently, e.g. different One Call accounts, districts
+    and feature layers of the same organization.
+
+    At most `max_concurrency` apps run at a time. Apps logging in to the same ArcGIS
+    organization with the same username share one `arcgis.GIS` connection, and apps using the
+    same One Call account share its sessions, as many as the largest `lookup_workers` among
+    them, and the pages fetched with them, so overlapping tickets are fetched once. A page is
+    dropped once every app of the account has read it or finished. An app that fails does not
+    stop the others, its error is returned in its result.
+
+    Args:
+        configs (list): `OcGisApp` keyword arguments of each app, as returned by
+            `ocgis.cli.app_options`. An optional 'name' key names the app in the results.
+        max_concurrency (int): Maximum number of apps running at the same time.
+    """
+
+    def __init__(self, configs: list, max_concurrency: int = 4):
+        self.configs = [dict(config) for config in configs]
+        self.max_concurrency = max(1, max_concurrency)
+        self.gis_pool = GisPool()
+        self._lock = threading.Lock()
+
+    def _create_app(self, tenant, options: dict, account: _Account):
+        from .ocgisapp import OcGisApp
+        if options.get('layer') is None and options.get('gis') is None and options.get('arcgis_link'):
+            options['gis'] = self.gis_pool.get(options['arcgis_link'], options.get('arcgis_username'), options.get('arcgis_password'))
+        app = OcGisApp(**options)
+        with self._lock:
+            if account.factory is None:
+                account.factory = app._create_backend_fetcher
+        app.fetcher_factory = lambda: SharedFetcher(account, tenant)
+        return app
+
+    def _run_one(self, tenant, name: str, options: dict, account: _Account, update_range: int | None, recheck_open: bool) -> TenantResult:
+        try:
+            app = self._create_app(tenant, options, account)
+            LOGGER.info(f"Start '{name}'.")
+            return TenantResult(name, report=app.run(update_range=update_range, recheck_open=recheck_open))
+        except Exception as e:
+            LOGGER.exception(f"Run of '{name}' failed.")
+            return TenantResult(name, error=e)
+        finally:
+            account.release(tenant)
+
+    def run(self, update_range: int | None = None, recheck_open: bool = True) -> list:
+        """Run every configuration once.
+
+        Args:
+            update_range (int, optional): Days to look back, defaults to each app's `update_range`.
+            recheck_open (bool): Whether to look up the open tickets outside of the update range.
+
+        Returns:
+            list: `TenantResult` of each configuration, in the order of `configs`.
+        """
+        accounts = {}
+        tenants = []
+        for index, config in enumerate(self.configs):
+            options = dict(config)
+            name = options.pop('name', None) or f'config-{index}'
+            account = accounts.setdefault(_account_key(options), _Account())
+            # Registered up front, so pages are kept for tenants that have not started yet.
+            account.register(index, options.get('lookup_workers', 1))
+            tenants.append((index, name, options, account))
+        for key, account in accounts.items():
+            LOGGER.debug(f"One Call account {key} serves {len(account.tenants)} configurations with up to {account.sessions} sessions.")
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                futures = [executor.submit(self._run_one, *tenant, update_range, recheck_open) for tenant in tenants]
+                results = [future.result() for future in futures]
+        finally:
+            for account in accounts.values():
+                account.close()
+        failed = [result.name for result in results if not result.ok]
+        LOGGER.info(f"Ran {len(results)} configurations, failed: {failed or 'none'}.")
+        return results
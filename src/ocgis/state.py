@@ -0,0 +1,105 @@
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+
+LOGGER = logging.getLogger(__name__)
+
+FINGERPRINT_IGNORED_ATTRIBUTES = {'lastAutomaticUpdate', 'OBJECTID'}
+FINGERPRINT_PRECISION = 6
+
+
+def ticket_fingerprint(ticket_dictionary: dict) -> str:
+    """
+    Compute a stable hash of a ticket's content.
+
+    Attributes are normalized to stripped strings and the automatic update timestamp and
+    OBJECTID are left out, so two parses of an unchanged ticket give the same fingerprint.
+
+    Args:
+        ticket_dictionary (dict): Feature dictionary with 'attributes' and 'geometry' keys.
+
+    Returns:
+        str: Hex digest of the ticket content.
+    """
+    attributes = {
+        key: '' if value is None else str(value).strip()
+        for key, value in ticket_dictionary['attributes'].items()
+        if key not in FINGERPRINT_IGNORED_ATTRIBUTES
+    }
+    rings = [
+        [[round(coordinate, FINGERPRINT_PRECISION) for coordinate in point] for point in ring]
+        for ring in ticket_dictionary['geometry']['rings'] or []
+    ]
+    content = json.dumps({'attributes': attributes, 'rings': rings}, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def _parse_datetime(value: str | None) -> datetime | None:
+    return datetime.fromisoformat(value) if value else None
+
+
+def _format_datetime(value: datetime | None) -> str | None:
+    return value.isoformat() if value else None
+
+
+class RunState:
+    """
+    Local state kept between runs in a JSON file.
+
+    Fingerprints are staged while tickets are processed and only committed for tickets whose
+    edit succeeded, so a failed write is retried on the next run. The state also keeps the
+    start time of the last successful run (the watermark) and of the last full window sweep.
+
+    Args:
+        path (str, optional): Location of the state file, created on the first save. Without a
+            path the state is only kept in memory.
+    """
+
+    def __init__(self, path: str | None):
+        self.path = path
+        self.fingerprints = {}
+        self.watermark = None
+        self.last_full_sweep = None
+        self._pending = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as state_file:
+                    content = json.load(state_file)
+                self.fingerprints = content.get('fingerprints', {})
+                self.watermark = _parse_datetime(content.get('watermark'))
+                self.last_full_sweep = _parse_datetime(content.get('last_full_sweep'))
+            except (OSError, ValueError):
+                LOGGER.exception(f"Could not read state file '{path}', starting with empty state.")
+
+    def is_unchanged(self, ticket_number: str, fingerprint: str) -> bool:
+        """Check whether the ticket was last written with the same fingerprint."""
+        return self.fingerprints.get(str(ticket_number)) == fingerprint
+
+    def stage(self, ticket_number: str, fingerprint: str):
+        """Remember a fingerprint until the ticket's edit result is known."""
+        self._pending[str(ticket_number)] = fingerprint
+
+    def commit(self, ticket_numbers: list):
+        """Keep the staged fingerprints of tickets that were written successfully."""
+        for ticket_number in ticket_numbers:
+            fingerprint = self._pending.pop(str(ticket_number), None)
+            if fingerprint is not None:
+                self.fingerprints[str(ticket_number)] = fingerprint
+
+    def save(self):
+        """Write the state file atomically and drop fingerprints that were never committed."""
+        self._pending.clear()
+        if not self.path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        temporary_path = f'{self.path}.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as state_file:
+            json.dump({
+                'fingerprints': self.fingerprints,
+                'watermark': _format_datetime(self.watermark),
+                'last_full_sweep': _format_datetime(self.last_full_sweep),
+            }, state_file)
+        os.replace(temporary_path, self.path)
@@ -0,0 +1,222 @@
+import concurrent.futures
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+
+LOGGER = logging.getLogger(__name__)
+
+EDIT_KINDS = ('adds', 'updates', 'deletes')
+RESULT_KEYS = {'adds': 'addResults', 'updates': 'updateResults', 'deletes': 'deleteResults'}
+
+
+def _attributes(item) -> dict:
+    """Attributes of a feature object or feature dictionary."""
+    return item.attributes if hasattr(item, 'attributes') else item.get('attributes') or {}
+
+
+def _sql_list(values: list) -> str:
+    return ', '.join("'" + str(value).replace("'", "''") + "'" for value in values)
+
+
+def _payload_size(kind: str, item) -> int:
+    """Approximate number of bytes an edit adds to the request body."""
+    if kind == 'deletes':
+        return len(str(item)) + 1
+    return len(json.dumps(getattr(item, 'as_dict', item), separators=(',', ':'), default=str)) + 1
+
+
+@dataclass
+class EditSummary:
+    """
+    Outcome of writing a set of edits.
+
+    `add_results`, `update_results` and `delete_results` are aligned with the adds, updates
+    and deletes that were passed to `EditWriter.write`, and hold the final result of each
+    edit after retries in the same format as the `edit_features` results.
+    """
+    add_results: list = field(default_factory=list)
+    update_results: list = field(default_factory=list)
+    delete_results: list = field(default_factory=list)
+    batches: int = 0
+    retries: int = 0
+
+    def _failures(self, results: list) -> list:
+        return [index for index, result in enumerate(results) if not result.get('success')]
+
+    @property
+    def failed_adds(self) -> list:
+        """Indexes of the adds that failed."""
+        return self._failures(self.add_results)
+
+    @property
+    def failed_updates(self) -> list:
+        """Indexes of the updates that failed."""
+        return self._failures(self.update_results)
+
+    @property
+    def failed_deletes(self) -> list:
+        """Indexes of the deletes that failed."""
+        return self._failures(self.delete_results)
+
+    def as_dict(self) -> dict:
+        return {
+            'adds': len(self.add_results) - len(self.failed_adds),
+            'updates': len(self.update_results) - len(self.failed_updates),
+            'deletes': len(self.delete_results) - len(self.failed_deletes),
+            'failed_adds': len(self.failed_adds),
+            'failed_updates': len(self.failed_updates),
+            'failed_deletes': len(self.failed_deletes),
+            'batches': self.batches,
+            'retries': self.retries,
+        }
+
+
+class EditWriter:
+    """
+    Writes edits to a feature layer in batches.
+
+    Edits are split into batches bounded by feature count and approximate payload size, which
+    are sent concurrently. A batch whose request fails is retried with exponential backoff,
+    and when a request succeeds only the individual edits reported as failed are re-queued.
+    Batches are sent with `rollback_on_failure=False`, so one failed edit does not fail the
+    rest of its batch.
+
+    A failed request may still have been committed by the server, so its adds are first looked
+    up by `key_field`: the ones found are reported as written and only the others are sent
+    again. Adds that cannot be looked up are not resent, as they could duplicate features.
+
+    Args:
+        layer: Any object with an arcgis `FeatureLayer.edit_features` compatible method.
+        max_features (int): Maximum number of edits in one request.
+        max_bytes (int, optional): Maximum approximate payload size of one request.
+        max_workers (int): Maximum number of requests in flight.
+        max_retries (int): Number of times an edit is retried before it is reported as failed.
+        backoff (float): Seconds to wait before the first retry, doubled on every attempt.
+        key_field (str, optional): Attribute identifying a feature, used to find the adds of a
+            failed request that were committed anyway.
+    """
+
+    def __init__(self, layer, max_features: int = 500, max_bytes: int | None = None, max_workers: int = 1, max_retries: int = 3, backoff: float = 2.0, key_field: str | None = 'ticketNumber'):
+        self.layer = layer
+        self.max_features = max_features
+        self.max_bytes = max_bytes
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.key_field = key_field
+
+    def _batches(self, edits: list) -> list:
+        """Split (kind, index, item) edits into batches within the request limits."""
+        batches, batch, batch_bytes = [], [], 0
+        for edit in edits:
+            size = _payload_size(edit[0], edit[2])
+            if batch and (len(batch) >= self.max_features or (self.max_bytes and batch_bytes + size > self.max_bytes)):
+                batches.append(batch)
+                batch, batch_bytes = [], 0
+            batch.append(edit)
+            batch_bytes += size
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _send(self, batch: list) -> dict:
+        request = {kind: [item for edit_kind, _, item in batch if edit_kind == kind] for kind in EDIT_KINDS}
+        # Without rollback_on_failure=False one bad feature fails its whole batch, on every retry.
+        return self.layer.edit_features(adds=request['adds'], updates=request['updates'], deletes=request['deletes'], rollback_on_failure=False)
+
+    def _committed(self, keys: list) -> dict:
+        """OBJECTID of the features whose `key_field` is one of `keys`, by key."""
+        page_size = (getattr(self.layer, 'properties', None) or {}).get('maxRecordCount') or 1000
+        committed = {}
+        for start in range(0, len(keys), page_size):
+            result = self.layer.query(where=f"{self.key_field} IN ({_sql_list(keys[start:start + page_size])})",
+                                      out_fields=f'OBJECTID,{self.key_field}',
+                                      return_geometry=False)
+            for feature in result.features:
+                committed[str(feature.attributes[self.key_field])] = feature.attributes['OBJECTID']
+        return committed
+
+    def _uncommitted_adds(self, adds: list, results: dict) -> list:
+        """Mark the adds of a failed request found in the layer as written and return the others."""
+        keyed = {}
+        for edit in adds:
+            key = _attributes(edit[2]).get(self.key_field) if self.key_field else None
+            if key is not None:
+                keyed[str(key)] = edit
+        if not keyed:
+            return []
+        try:
+            committed = self._committed(list(keyed))
+        except Exception:
+            LOGGER.exception(f"Could not check which of {len(keyed)} adds were written, they are not resent.")
+            return []
+        for key, (kind, index, _) in keyed.items():
+            if key in committed:
+                results[kind][index] = {'objectId': committed[key], 'success': True}
+        LOGGER.info(f"{len(committed)} of {len(keyed)} adds of the failed request were written.")
+        return [edit for key, edit in keyed.items() if key not in committed]
+
+    def write(self, adds: list = None, updates: list = None, deletes: list = None) -> EditSummary:
+        """
+        Write the edits and return the result of each one.
+
+        Args:
+            adds (list): Features to add.
+            updates (list): Features to update.
+            deletes (list): Object IDs to delete.
+
+        Returns:
+            EditSummary: Final result of each edit and request statistics.
+        """
+        requested = {'adds': adds or [], 'updates': updates or [], 'deletes': deletes or []}
+        results = {kind: [None] * len(items) for kind, items in requested.items()}
+        pending = [(kind, index, item) for kind in EDIT_KINDS for index, item in enumerate(requested[kind])]
+        summary = EditSummary()
+
+        attempt = 0
+        while pending:
+            if attempt:
+                delay = self.backoff * 2 ** (attempt - 1)
+                LOGGER.info(f"Retrying {len(pending)} edits in {delay:.1f}s (attempt {attempt} of {self.max_retries}).")
+                time.sleep(delay)
+                summary.retries += 1
+            batches = self._batches(pending)
+            summary.batches += len(batches)
+            pending = []
+
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+                futures = {executor.submit(self._send, batch): batch for batch in batches}
+                for future in concurrent.futures.as_completed(futures):
+                    batch = futures[future]
+                    try:
+                        response = future.result()
+                    except Exception as e:
+                        LOGGER.exception(f"Edit request with {len(batch)} edits failed.")
+                        for kind, index, item in batch:
+                            results[kind][index] = {'success': False, 'error': {'description': str(e)}}
+                        pending.extend(edit for edit in batch if edit[0] != 'adds')
+                        # The server may have committed the request before it failed, resending
+                        # the adds it wrote would duplicate features.
+                        pending.extend(self._uncommitted_adds([edit for edit in batch if edit[0] == 'adds'], results))
+                        continue
+
+                    positions = {kind: 0 for kind in EDIT_KINDS}
+                    for kind, index, item in batch:
+                        kind_results = response.get(RESULT_KEYS[kind]) or []
+                        position = positions[kind]
+                        positions[kind] += 1
+                        result = kind_results[position] if position < len(kind_results) else {'success': False, 'error': {'description': 'Missing edit result.'}}
+                        results[kind][index] = result
+                        if not result.get('success'):
+                            LOGGER.warning(f"Edit failed for {kind[:-1]} {index}: {result.get('error')}")
+                            pending.append((kind, index, item))
+
+            attempt += 1
+            if attempt > self.max_retries:
+                break
+
+        summary.add_results = results['adds']
+        summary.update_results = results['updates']
+        summary.delete_results = results['deletes']
+        return summary
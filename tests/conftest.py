@@ -0,0 +1,15 @@
+import pytest
+
+from ocgis.replay import FakeFeatureLayer, synthetic_corpus, write_corpus
+
+
+@pytest.fixture
+def replay_options(tmp_path):
+    """`OcGisApp` arguments replaying a synthetic corpus into an in-memory layer."""
+    replay_path = tmp_path / 'replay'
+    write_corpus(str(replay_path), synthetic_corpus(40, districts=['cf1', 'cf2']))
+    return dict(arcgis_username=None, arcgis_password=None, arcgis_link=None, layer_url=None,
+                onecall_username=None, onecall_password=None, onecall_login_url=None,
+                districts=['cf1', 'cf2'], driver_executable_path=None, update_range=3, state='IA',
+                fetch_backend='replay', replay_path=str(replay_path), layer=FakeFeatureLayer(),
+                state_path=str(tmp_path / 'state.json'))
@@ -0,0 +1,36 @@
+import os
+
+from ocgis.cache import OBJECTS_DIRECTORY, TicketPageCache
+
+
+def _object_files(directory) -> list:
+    return [name for _, _, names in os.walk(os.path.join(directory, OBJECTS_DIRECTORY)) for name in names]
+
+
+def test_changed_pages_replace_their_previous_object(tmp_path):
+    cache = TicketPageCache(str(tmp_path))
+    for version in range(200):
+        cache.put('123', f'<p>version {version}</p>')
+    assert len(_object_files(tmp_path)) == 1
+    assert cache.read('123') == '<p>version 199</p>'
+
+
+def test_shared_pages_are_kept_while_referenced(tmp_path):
+    cache = TicketPageCache(str(tmp_path))
+    cache.put('1', '<p>same</p>')
+    cache.put('2', '<p>same</p>')
+    cache.put('1', '<p>changed</p>')
+    assert cache.read('2') == '<p>same</p>'
+    assert len(_object_files(tmp_path)) == 2
+    assert cache.stats()['pages'] == 2
+
+
+def test_size_limit_evicts_least_recently_used_pages(tmp_path):
+    cache = TicketPageCache(str(tmp_path), max_bytes=250)
+    for number in range(10):
+        cache.put(number, f'<p>{number}</p>' + 'x' * 90, final=number == 0)
+    assert cache.stats()['bytes'] <= 250
+    assert len(_object_files(tmp_path)) == cache.stats()['pages']
+    assert cache.read(0) is not None
+    assert cache.read(9) is not None
+    assert cache.read(1) is None
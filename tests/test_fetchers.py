@@ -0,0 +1,38 @@
+import pytest
+
+from ocgis.fetchers import TICKET_SEPARATOR, TicketFetcher, iter_ticket_chunks
+from ocgis.replay import synthetic_corpus
+
+PAGE = '<html><body>' + ''.join(synthetic_corpus(5)) + '</body></html>'
+
+
+@pytest.mark.parametrize('block_size', [1, 7, len(TICKET_SEPARATOR) - 1, len(TICKET_SEPARATOR), 1000, len(PAGE)])
+def test_iter_ticket_chunks_matches_split(block_size):
+    pieces = (PAGE[start:start + block_size] for start in range(0, len(PAGE), block_size))
+    assert list(iter_ticket_chunks(pieces)) == PAGE.split(TICKET_SEPARATOR)[1:]
+
+
+@pytest.mark.parametrize('page', ['', '<html>no tickets</html>', TICKET_SEPARATOR, TICKET_SEPARATOR * 3 + 'last'])
+def test_iter_ticket_chunks_edge_cases(page):
+    assert list(iter_ticket_chunks(page[index:index + 2] for index in range(0, len(page), 2))) == page.split(TICKET_SEPARATOR)[1:]
+
+
+def test_backend_missing_a_fetch_method_fails_when_created():
+    class PrintPageOnly(TicketFetcher):
+        def fetch_tickets(self, update_range: int) -> str:
+            return PAGE
+
+    with pytest.raises(TypeError, match='lookup_ticket'):
+        PrintPageOnly()
+
+
+def test_iter_tickets_defaults_to_splitting_the_fetched_page():
+    class Backend(TicketFetcher):
+        def fetch_tickets(self, update_range: int) -> str:
+            return PAGE
+
+        def lookup_ticket(self, ticket_number: str, state: str) -> str:
+            return ''
+
+    with Backend() as fetcher:
+        assert list(fetcher.iter_tickets(3)) == PAGE.split(TICKET_SEPARATOR)[1:]
@@ -0,0 +1,44 @@
+import pytest
+
+from ocgis.geometry import clean_ring, ring_statistics
+
+SQUARE = [[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]]
+
+
+def test_clean_ring_drops_duplicate_and_collinear_vertices():
+    ring = [[0, 0], [0, 0], [5, 0], [10, 0], [10, 10], [10, 10], [0, 10], [0, 5]]
+    assert clean_ring(ring) == SQUARE
+
+
+def test_clean_ring_closes_open_rings_and_keeps_clean_rings():
+    assert clean_ring(SQUARE[:-1]) == SQUARE
+    assert clean_ring(SQUARE) == SQUARE
+    assert clean_ring([]) == []
+
+
+def test_clean_ring_simplifies_within_tolerance():
+    ring = [[0, 0], [5, 0.01], [10, 0], [10, 10], [5, 9.99], [0, 10]]
+    assert clean_ring(ring, tolerance=0.1) == SQUARE
+    assert len(clean_ring(ring, tolerance=0.001)) == len(ring) + 1
+
+
+def test_clean_ring_never_leaves_fewer_than_three_vertices():
+    ring = [[0, 0], [10, 0.5], [20, 0], [10, -0.5]]
+    cleaned = clean_ring(ring, tolerance=100)
+    assert len(cleaned) == 4
+    assert cleaned[0] == cleaned[-1]
+
+
+def test_clean_ring_rounds_to_precision():
+    ring = [[0.123, 0.456], [10.987, 0.001], [10.5, 10.49]]
+    assert clean_ring(ring, precision=1) == [[0.1, 0.5], [11.0, 0.0], [10.5, 10.5], [0.1, 0.5]]
+    assert clean_ring(ring, precision=0) == [[0, 0], [11, 0], [10, 10], [0, 0]]
+    assert all(isinstance(value, int) for point in clean_ring(ring, precision=0) for value in point)
+
+
+@pytest.mark.parametrize('ring', [SQUARE, SQUARE[:-1]])
+def test_ring_statistics_counts_rings_as_closed(ring):
+    vertices, size = ring_statistics([ring])
+    assert vertices == 5
+    assert size == len(str([ring]).replace(' ', ''))
+    assert ring_statistics([ring])[0] == ring_statistics([clean_ring(ring)])[0]
@@ -0,0 +1,130 @@
+import http.server
+import threading
+import urllib.parse
+
+import pytest
+
+pytest.importorskip('requests')
+
+from ocgis import fetchers
+from ocgis.fetchers import TICKET_SEPARATOR, HttpFetcher
+
+LOGIN_PAGE = ('<form action="/dologin" method="post"><input id="username" name="user">'
+              '<input name="password" type="password"><input type="hidden" name="token" value="t1">'
+              '<button id="btn-login" name="go" value="1">Log in</button></form>')
+SEARCH_PAGE = ('<form action="/iarecApp/search/results.jsp" method="post"><input id="auditStartDate" name="auditStartDate">'
+               '<input id="auditEndDate" name="auditEndDate"><input type="submit" name="action" value="Show Tickets"></form>')
+TICKET_SEARCH_PAGE = ('<form action="ticketResult.jsp"><input id="ticketNumber" name="ticketNumber">'
+                      '<select name="db"><option value="ia">IA</option><option value="ne">NE</option></select>'
+                      '<input type="submit" name="Search" value="Search"></form>')
+TICKETS = [f'<p>Ticket {number}</p>' + 'x' * 50000 for number in range(4)]
+PRINT_PAGE = '<html><body>' + ''.join(TICKET_SEPARATOR + ticket for ticket in TICKETS)
+
+
+class OneCallHandler(http.server.BaseHTTPRequestHandler):
+    """Stub of the One Call site, every page but the login form needs a session cookie."""
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body: str, cookie: str = None):
+        body = body.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if cookie:
+            self.send_header('Set-Cookie', f'sid={cookie}; Path=/')
+        self.end_headers()
+        # Written in small blocks so the client reads the page as several pieces.
+        for start in range(0, len(body), 8192):
+            self.wfile.write(body[start:start + 8192])
+
+    def _logged_in(self) -> bool:
+        cookies = dict(part.strip().split('=', 1) for part in (self.headers.get('Cookie') or '').split(';') if '=' in part)
+        return cookies.get('sid') in self.server.sessions
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        self.server.requests.append(('GET', url.path))
+        if url.path == '/login' or not self._logged_in():
+            return self._send(LOGIN_PAGE)
+        if url.path.endswith('/printTickets.jsp'):
+            return self._send(PRINT_PAGE)
+        if url.path.endswith('/ticketResult.jsp'):
+            query = urllib.parse.parse_qs(url.query)
+            return self._send(f"<p>Ticket {query['ticketNumber'][0]} in {query['db'][0]}</p>")
+        pages = {'/legacyApplication': '<p>Legacy</p>',
+                 '/iarecApp/servlet/Login': SEARCH_PAGE,
+                 '/iarecApp/ticketSearchAndStatusSelector.jsp': TICKET_SEARCH_PAGE}
+        self._send(pages.get(url.path, '<p>Not found</p>'))
+
+    def do_POST(self):
+        url = urllib.parse.urlparse(self.path)
+        form = urllib.parse.parse_qs(self.rfile.read(int(self.headers['Content-Length'])).decode())
+        self.server.requests.append(('POST', url.path))
+        if url.path == '/dologin':
+            if form.get('user') == ['user'] and form.get('password') == ['secret'] and form.get('token') == ['t1']:
+                self.server.logins += 1
+                session = f'session-{self.server.logins}'
+                self.server.sessions.add(session)
+                return self._send('<p>Welcome</p>', cookie=session)
+            return self._send(LOGIN_PAGE)
+        if not self._logged_in():
+            return self._send(LOGIN_PAGE)
+        self.server.searches.append((form['auditStartDate'][0], form['auditEndDate'][0]))
+        self._send('<a href="printTickets.jsp">Print</a>')
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), OneCallHandler)
+    server.sessions, server.requests, server.searches, server.logins = set(), [], [], 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    root = f'http://127.0.0.1:{server.server_port}'
+    monkeypatch.setattr(fetchers, 'LEGACY_APPLICATION_URL', f'{root}/legacyApplication')
+    monkeypatch.setattr(fetchers, 'LEGACY_LOGIN_URL', f'{root}/iarecApp/servlet/Login?enc=abc')
+    monkeypatch.setattr(fetchers, 'TICKET_SEARCH_URL', f'{root}/iarecApp/ticketSearchAndStatusSelector.jsp')
+    server.login_url = f'{root}/login'
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_iter_tickets_logs_in_searches_and_streams_the_print_page(server):
+    with HttpFetcher('user', 'secret', server.login_url, timeout=5) as fetcher:
+        tickets = list(fetcher.iter_tickets(3))
+    assert tickets == PRINT_PAGE.split(TICKET_SEPARATOR)[1:]
+    assert server.logins == 1
+    assert server.searches == [fetchers._audit_dates(3)]
+    assert ('GET', '/iarecApp/search/printTickets.jsp') in server.requests
+
+
+def test_fetch_tickets_returns_the_whole_print_page(server):
+    with HttpFetcher('user', 'secret', server.login_url, timeout=5) as fetcher:
+        assert fetcher.fetch_tickets(3) == PRINT_PAGE
+
+
+def test_lookup_ticket_selects_the_state_database(server):
+    with HttpFetcher('user', 'secret', server.login_url, timeout=5) as fetcher:
+        assert fetcher.lookup_ticket(123, 'NE') == '<p>Ticket 123 in ne</p>'
+        assert fetcher.lookup_ticket('456', 'IA') == '<p>Ticket 456 in ia</p>'
+    assert server.logins == 1
+
+
+def test_expired_session_logs_in_again(server):
+    with HttpFetcher('user', 'secret', server.login_url, timeout=5) as fetcher:
+        fetcher.lookup_ticket(1, 'IA')
+        server.sessions.clear()
+        assert fetcher.lookup_ticket(2, 'IA') == '<p>Ticket 2 in ia</p>'
+        assert server.logins == 2
+        server.sessions.clear()
+        assert list(fetcher.iter_tickets(3)) == TICKETS
+        assert server.logins == 3
+
+
+def test_rejected_login_raises(server):
+    with HttpFetcher('user', 'wrong', server.login_url, timeout=5) as fetcher:
+        with pytest.raises(ValueError):
+            list(fetcher.iter_tickets(3))
+    assert server.logins == 0
@@ -0,0 +1,19 @@
+from ocgis.ocgisapp import _query_ticket_numbers
+from ocgis.replay import FakeFeatureLayer
+
+
+class ClosingLayer(FakeFeatureLayer):
+    """Layer whose first feature of every page is closed by a concurrent write once it has been read."""
+
+    def query(self, *args, **kwargs):
+        result = super().query(*args, **kwargs)
+        if result.features:
+            self.features[result.features[0].attributes['OBJECTID']].attributes['status'] = 'CLOSED'
+        return result
+
+
+def test_query_ticket_numbers_pages_are_not_shifted_by_concurrent_edits():
+    layer = ClosingLayer([{'attributes': {'ticketNumber': str(number), 'status': 'OPEN'}, 'geometry': None} for number in range(30)],
+                         max_record_count=5)
+    ticket_numbers = [ticket_number for ticket_number, _ in _query_ticket_numbers(layer, "status = 'OPEN'")]
+    assert ticket_numbers == [str(number) for number in range(30)]
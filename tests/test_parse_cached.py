@@ -0,0 +1,31 @@
+import re
+
+from ocgis.ocgisapp import OcGisApp
+from ocgis.replay import synthetic_corpus
+
+
+def _cached_app(options: dict, tmp_path, tickets: list) -> OcGisApp:
+    app = OcGisApp(**dict(options, cache_path=str(tmp_path / 'cache')))
+    for ticket in tickets:
+        app.page_cache.put(re.search(r'<span>Ticket No:</span> <span>(\d+)</span>', ticket).group(1), ticket)
+    return app
+
+
+def test_parse_cached_with_a_wkid_does_not_connect(replay_options, tmp_path):
+    app = _cached_app(dict(replay_options, layer=None), tmp_path, synthetic_corpus(5))
+
+    def connect():
+        raise AssertionError("parse_cached connected to ArcGIS.")
+    app._connect = connect
+    features = app.parse_cached(spatial_reference=102100)
+    assert len(features) == 5
+    for feature in features:
+        assert feature['geometry']['spatialReference'] == {'wkid': 102100, 'latestWkid': 102100}
+        assert all(abs(x) < 2.1e7 and abs(y) < 2.1e7 for ring in feature['geometry']['rings'] for x, y in ring)
+
+
+def test_parse_cached_defaults_to_the_layer_spatial_reference(replay_options, tmp_path):
+    app = _cached_app(replay_options, tmp_path, synthetic_corpus(3))
+    features = app.parse_cached()
+    assert len(features) == 3
+    assert features[0]['geometry']['spatialReference']['wkid'] == replay_options['layer'].properties['extent']['spatialReference']['wkid']
@@ -0,0 +1,62 @@
+import threading
+import time
+
+import pytest
+
+from ocgis.pipeline import Pipeline
+
+
+def test_pipeline_passes_items_through_every_stage():
+    results = []
+    with Pipeline(maxsize=1) as pipeline:
+        first, second = pipeline.new_queue(), pipeline.new_queue()
+        pipeline.source('source', range(10), first)
+        pipeline.stage('square', lambda item: item * item if item % 2 else None, first, second)
+        pipeline.sink('sink', results.append, second)
+        pipeline.join()
+    assert results == [1, 9, 25, 49, 81]
+
+
+def test_sink_waits_for_every_producer():
+    results = []
+    with Pipeline() as pipeline:
+        outbox = pipeline.new_queue()
+        pipeline.sink('sink', results.append, outbox, producers=2)
+        pipeline.source('a', range(3), outbox)
+        pipeline.source('b', range(3, 6), outbox)
+        pipeline.join()
+    assert sorted(results) == list(range(6))
+
+
+def test_stage_error_stops_the_pipeline_and_is_raised():
+    closed = threading.Event()
+
+    def endless():
+        try:
+            while True:
+                yield 1
+        finally:
+            closed.set()
+
+    def fail(item):
+        raise RuntimeError('stage failed')
+
+    start = time.monotonic()
+    with pytest.raises(RuntimeError, match='stage failed'):
+        with Pipeline() as pipeline:
+            first, second = pipeline.new_queue(), pipeline.new_queue()
+            pipeline.source('source', endless(), first)
+            pipeline.stage('fail', fail, first, second)
+            pipeline.sink('sink', lambda item: None, second)
+            pipeline.join()
+    assert closed.is_set()
+    assert time.monotonic() - start < 5
+
+
+def test_wait_raises_the_error_of_another_stage():
+    with Pipeline() as pipeline:
+        outbox = pipeline.new_queue()
+        source = pipeline.source('source', iter(range(100)), outbox)
+        pipeline.sink('sink', lambda item: 1 / 0, outbox)
+        with pytest.raises(ZeroDivisionError):
+            pipeline.wait(source)
@@ -0,0 +1,130 @@
+import threading
+import time
+
+from ocgis.pool import WorkerPool
+
+
+class Worker:
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+
+def _run(pool, function, items):
+    return {item: (result, error) for item, result, error in pool.imap_unordered(function, items)}
+
+
+def test_borrowed_worker_is_not_closed_when_its_task_fails():
+    borrowed = Worker('borrowed')
+    closed = []
+
+    def fail_on_borrowed(worker, item):
+        if worker is borrowed:
+            raise RuntimeError('session lost')
+        return worker.name
+
+    with WorkerPool(lambda: Worker('created'), size=1, close=closed.append, workers=[borrowed]) as pool:
+        results = _run(pool, fail_on_borrowed, [1, 2])
+    assert isinstance(results[1][1], RuntimeError)
+    assert results[2] == ('created', None)
+    assert borrowed not in closed
+    assert [worker.name for worker in closed] == ['created']
+
+
+def test_created_worker_is_closed_and_replaced_when_its_task_fails():
+    created = []
+    closed = []
+
+    def factory():
+        created.append(Worker(f'worker-{len(created)}'))
+        return created[-1]
+
+    def fail_first(worker, item):
+        if item == 1:
+            raise RuntimeError('session lost')
+        return worker.name
+
+    with WorkerPool(factory, size=1, close=closed.append) as pool:
+        results = _run(pool, fail_first, [1, 2])
+    assert results[2] == ('worker-1', None)
+    assert closed == created
+
+
+def test_workers_run_one_task_at_a_time():
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def task(worker, item):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        with lock:
+            active[0] -= 1
+        return item
+
+    with WorkerPool(lambda: Worker('worker'), size=2) as pool:
+        results = _run(pool, task, range(20))
+    assert sorted(results) == list(range(20))
+    assert peak[0] <= 2
+
+
+def test_closing_early_cancels_the_queued_items():
+    started = []
+
+    def slow(worker, item):
+        started.append(item)
+        time.sleep(0.05)
+        return item
+
+    with WorkerPool(lambda: Worker('worker'), size=2) as pool:
+        results = pool.imap_unordered(slow, range(100))
+        next(results)
+        start = time.monotonic()
+        results.close()
+        assert time.monotonic() - start < 0.5
+    assert len(started) <= 4
+
+
+def test_items_are_submitted_at_most_size_ahead():
+    pulled = []
+
+    def items():
+        for item in range(1000):
+            pulled.append(item)
+            yield item
+
+    with WorkerPool(lambda: Worker('worker'), size=3) as pool:
+        results = pool.imap_unordered(lambda worker, item: item, items())
+        next(results)
+        assert len(pulled) <= 4
+        assert len(list(results)) == 999
+    assert len(pulled) == 1000
+
+
+def test_pool_gives_up_after_repeated_startup_failures():
+    created = []
+
+    def factory():
+        created.append(Worker('worker'))
+        return created[-1]
+
+    def login_fails(worker, item):
+        raise ConnectionError('login failed')
+
+    with WorkerPool(factory, size=1, max_startup_failures=3) as pool:
+        errors = [error for _, _, error in pool.imap_unordered(login_fails, range(50))]
+    assert len(created) == 3
+    assert all(error is not None for error in errors)
+    assert isinstance(errors[-1], RuntimeError)
+    assert isinstance(errors[-1].__cause__, ConnectionError)
+
+
+def test_failures_of_proven_workers_do_not_stop_the_pool():
+    def fail_odd(worker, item):
+        if item % 2:
+            raise LookupError(item)
+        return item
+
+    with WorkerPool(lambda: Worker('worker'), size=1, max_startup_failures=2) as pool:
+        results = list(pool.imap_unordered(fail_odd, range(10)))
+    assert sorted(item for item, result, error in results if error is None) == [0, 2, 4, 6, 8]
+    assert all(isinstance(error, LookupError) for _, _, error in results if error is not None)
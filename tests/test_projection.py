@@ -0,0 +1,58 @@
+import math
+
+import pytest
+
+from ocgis.ocgisapp import convert_geometry_rings, convert_geometry_rings_batch
+
+EARTH_RADIUS = 6378137.0
+# Web mercator coordinates are compared to within a millimeter.
+TOLERANCE = 1e-3
+
+
+def _mercator(lat, lon):
+    return [EARTH_RADIUS * math.radians(lon), EARTH_RADIUS * math.log(math.tan(math.pi / 4 + math.radians(lat) / 2))]
+
+
+def _assert_rings_close(actual, expected):
+    assert len(actual) == len(expected)
+    for actual_ring, expected_ring in zip(actual, expected):
+        assert len(actual_ring) == len(expected_ring)
+        for actual_point, expected_point in zip(actual_ring, expected_ring):
+            assert actual_point == pytest.approx(expected_point, abs=TOLERANCE)
+
+
+@pytest.mark.parametrize('wkid', [3857, 102100])
+def test_matches_closed_form(wkid):
+    rings = [[[42.5, -92.45], [42.51, -92.44], [42.49, -92.43], [42.5, -92.45]]]
+    expected = [[_mercator(lat, lon) for lat, lon in ring] for ring in rings]
+    _assert_rings_close(convert_geometry_rings(rings, wkid), expected)
+
+
+def test_extent_of_web_mercator():
+    (corner,), = convert_geometry_rings([[[85.0511287798066, 180.0]]])
+    assert corner == pytest.approx([20037508.342789244, 20037508.342789244], abs=TOLERANCE)
+
+
+def test_matches_project_as():
+    geometry = pytest.importorskip('arcgis.geometry')
+    rings = [[[42.5, -92.45], [42.51, -92.44], [42.49, -92.43]]]
+    polygon = geometry.Polygon({'rings': [[[lon, lat] for lat, lon in ring] for ring in rings], 'spatialReference': {'wkid': 4326}})
+    expected = polygon.project_as({'wkid': 3857})['rings']
+    _assert_rings_close(convert_geometry_rings(rings, 3857), expected)
+
+
+def test_batch_splits_tickets_and_rings():
+    coordinate_sets = [
+        [[[42.5, -92.45], [42.6, -92.4]]],
+        [],
+        [[[41.0, -93.0]], [], [[40.0, -91.0], [40.1, -91.1], [40.2, -91.2]]],
+    ]
+    projected = convert_geometry_rings_batch(coordinate_sets, 3857)
+    assert [[len(ring) for ring in rings] for rings in projected] == [[2], [], [1, 0, 3]]
+    for rings, projected_rings in zip(coordinate_sets, projected):
+        _assert_rings_close(projected_rings, [[_mercator(lat, lon) for lat, lon in ring] for ring in rings])
+
+
+def test_empty_rings():
+    assert convert_geometry_rings([], 3857) == []
+    assert convert_geometry_rings_batch([[[]], []], 3857) == [[[]], []]
@@ -0,0 +1,80 @@
+import os
+import time
+
+import pytest
+
+from ocgis.ocgisapp import OcGisApp
+from ocgis.replay import PRINT_TICKETS_FILE, FakeFeatureLayer, _where_predicate, synthetic_corpus, write_corpus
+
+
+@pytest.mark.parametrize('where, attributes, expected', [
+    ('1=1', {}, True),
+    (None, {'status': 'OPEN'}, True),
+    ("status = 'OPEN'", {'status': 'OPEN'}, True),
+    ("status = 'OPEN'", {'status': 'CLOSED'}, False),
+    ("status <> 'OPEN'", {'status': 'CLOSED'}, True),
+    ("status != 'OPEN'", {'status': None}, True),
+    ("ticketNumber IN ('1', '2')", {'ticketNumber': 2}, True),
+    ("ticketNumber NOT IN ('1', '2')", {'ticketNumber': '3'}, True),
+    ("ticketNumber not in ('1','2')", {'ticketNumber': '1'}, False),
+    ("OBJECTID = 5", {'OBJECTID': 5}, True),
+    ("status = 'OPEN' AND ticketNumber IN ('1')", {'status': 'OPEN', 'ticketNumber': '2'}, False),
+    ("owner = 'O''Brien'", {'owner': "O'Brien"}, True),
+    ("status = 'OPEN' AND OBJECTID > 5", {'status': 'OPEN', 'OBJECTID': 6}, True),
+    ("OBJECTID > 5", {'OBJECTID': 5}, False),
+    ("OBJECTID <= 5", {'OBJECTID': '5'}, True),
+])
+def test_where_predicate(where, attributes, expected):
+    assert _where_predicate(where)(attributes) is expected
+
+
+@pytest.mark.parametrize('where', ["status LIKE 'O%'", "status = 'OPEN' OR 1=1", 'ticketNumber BETWEEN 1 AND 5'])
+def test_where_predicate_rejects_unsupported_clauses(where):
+    with pytest.raises(ValueError):
+        _where_predicate(where)
+
+
+def test_fake_layer_pages_queries():
+    layer = FakeFeatureLayer([{'attributes': {'status': 'OPEN'}, 'geometry': None} for _ in range(7)], max_record_count=3)
+    assert layer.query(where="status = 'OPEN'", return_count_only=True) == 7
+    assert [len(layer.query(result_offset=offset).features) for offset in (0, 3, 6)] == [3, 3, 1]
+
+
+def test_replay_run_and_unchanged_rerun(replay_options):
+    layer = replay_options['layer']
+    first = OcGisApp(**replay_options).run()
+    assert first['counters']['site.tickets'] == first['counters']['site.add'] == 40
+    assert len(layer.features) == 40
+    edits = layer.edit_count
+    second = OcGisApp(**replay_options).run()
+    assert second['counters']['site.unchanged'] == 40
+    assert second['counters']['site.edit_batches'] == 0
+    assert layer.edit_count == edits
+
+
+class SlowLayer(FakeFeatureLayer):
+    """Layer whose requests take long enough for the snapshot to overlap the site writes."""
+
+    def query(self, *args, **kwargs):
+        time.sleep(0.02)
+        return super().query(*args, **kwargs)
+
+    def edit_features(self, *args, **kwargs):
+        time.sleep(0.1)
+        return super().edit_features(*args, **kwargs)
+
+
+def test_run_rechecks_every_open_ticket_while_site_tickets_close(tmp_path):
+    # Every fourth ticket is on the print tickets page and gets closed by the site phase, the
+    # others are open in the layer and must all be looked up, whatever the paging.
+    tickets = synthetic_corpus(40, open_ratio=0)
+    write_corpus(str(tmp_path), tickets)
+    with open(os.path.join(tmp_path, PRINT_TICKETS_FILE), 'w', encoding='utf-8') as page_file:
+        page_file.write('<html><body>' + ''.join(tickets[::4]) + '</body></html>')
+    layer = SlowLayer([{'attributes': {'ticketNumber': str(2400000000 + offset), 'status': 'OPEN'}, 'geometry': None}
+                       for offset in range(40)], max_record_count=5)
+    app = OcGisApp.replay(str(tmp_path), layer, districts=['cf1', 'cf2'], closed_statuses=['Marked'], stream_batch_size=2)
+    report = app.run()
+    assert report['counters']['site.tickets'] == 10
+    assert report['counters']['open.tickets'] == 30
+    assert all(feature.attributes['status'] == 'CLOSED' for feature in layer.features.values())
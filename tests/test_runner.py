@@ -0,0 +1,99 @@
+import threading
+import time
+
+import pytest
+
+from ocgis.runner import FanOutRunner, SharedFetcher, _Account
+
+
+class CountingFetcher:
+    """Fetcher recording the concurrent calls made on all of its instances."""
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+        self.closed = False
+        with stats['lock']:
+            stats['created'] += 1
+
+    def lookup_ticket(self, ticket_number, state):
+        with self.stats['lock']:
+            self.stats['lookups'] += 1
+            self.stats['active'] += 1
+            self.stats['peak'] = max(self.stats['peak'], self.stats['active'])
+        time.sleep(0.02)
+        with self.stats['lock']:
+            self.stats['active'] -= 1
+        if ticket_number == 'bad':
+            raise RuntimeError('lookup failed')
+        return f'ticket {ticket_number}'
+
+    def iter_tickets(self, update_range):
+        with self.stats['lock']:
+            self.stats['pages'] += 1
+        yield from ['one', 'two']
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def stats():
+    return {'lock': threading.Lock(), 'created': 0, 'lookups': 0, 'pages': 0, 'active': 0, 'peak': 0}
+
+
+def test_account_runs_concurrent_calls_on_up_to_its_sessions(stats):
+    account = _Account(lambda: CountingFetcher(stats))
+    account.register('a', sessions=3)
+    fetcher = SharedFetcher(account, 'a')
+    threads = [threading.Thread(target=fetcher.lookup_ticket, args=(number, 'IA')) for number in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert stats['created'] == 3
+    assert stats['peak'] == 3
+    assert stats['lookups'] == 12
+
+
+def test_account_replaces_a_session_whose_call_failed(stats):
+    account = _Account(lambda: CountingFetcher(stats))
+    account.register('a')
+    fetcher = SharedFetcher(account, 'a')
+    with pytest.raises(RuntimeError):
+        fetcher.lookup_ticket('bad', 'IA')
+    assert fetcher.lookup_ticket(1, 'IA') == 'ticket 1'
+    assert stats['created'] == 2
+
+
+def test_pages_are_fetched_once_and_dropped_once_every_tenant_read_them(stats):
+    account = _Account(lambda: CountingFetcher(stats))
+    for tenant in 'abc':
+        account.register(tenant)
+    a, b = SharedFetcher(account, 'a'), SharedFetcher(account, 'b')
+    assert list(a.iter_tickets(3)) == list(b.iter_tickets(3)) == ['one', 'two']
+    assert a.lookup_ticket(1, 'IA') == b.lookup_ticket(1, 'IA') == 'ticket 1'
+    assert (stats['pages'], stats['lookups'], len(account.pages)) == (1, 1, 2)
+    account.release('c')
+    assert len(account.pages) == 0
+    a.lookup_ticket(2, 'IA')
+    account.release('b')
+    assert len(account.pages) == 0
+
+
+def test_single_tenant_streams_without_keeping_pages(stats):
+    account = _Account(lambda: CountingFetcher(stats))
+    account.register('a')
+    fetcher = SharedFetcher(account, 'a')
+    tickets = fetcher.iter_tickets(3)
+    assert not isinstance(tickets, list)
+    assert list(tickets) == ['one', 'two']
+    fetcher.lookup_ticket(1, 'IA')
+    assert len(account.pages) == 0
+    assert stats['created'] == 1
+
+
+def test_failed_configuration_does_not_stop_the_others(replay_options):
+    configs = [dict(replay_options, name='good'), dict(replay_options, name='bad', replay_path='/nonexistent', state_path=None)]
+    good, bad = FanOutRunner(configs, max_concurrency=2).run()
+    assert good.ok and good.report['counters']['site.add'] > 0
+    assert isinstance(bad.error, FileNotFoundError)
@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+
+from ocgis.ocgisapp import OcGisApp
+from ocgis.state import RunState
+
+
+def _serve(options: dict, reports: list) -> list:
+    app = OcGisApp(**options)
+    calls = []
+
+    def run(update_range, recheck_open):
+        calls.append((update_range, recheck_open))
+        return reports[len(calls) - 1]
+    app.run = run
+    app.serve(interval=0, max_cycles=len(reports))
+    return calls
+
+
+def _save_state(path: str, watermark: datetime, last_full_sweep: datetime) -> RunState:
+    state = RunState(path)
+    state.watermark, state.last_full_sweep = watermark, last_full_sweep
+    state.save()
+    return state
+
+
+def test_first_cycle_sweeps_the_full_window(replay_options):
+    assert _serve(replay_options, [{}, {}]) == [(3, True), (0, False)]
+
+
+def test_restart_resumes_from_the_persisted_watermark(replay_options):
+    _save_state(replay_options['state_path'], datetime.now() - timedelta(days=2), datetime.now() - timedelta(hours=1))
+    assert _serve(replay_options, [{}]) == [(2, False)]
+
+
+def test_restart_sweeps_when_the_last_full_sweep_is_due(replay_options):
+    _save_state(replay_options['state_path'], datetime.now() - timedelta(minutes=5), datetime.now() - timedelta(days=2))
+    assert _serve(replay_options, [{}]) == [(3, True)]
+
+
+def test_failed_edits_keep_the_watermark(replay_options):
+    watermark = datetime.now() - timedelta(days=2)
+    _save_state(replay_options['state_path'], watermark, datetime.now() - timedelta(hours=1))
+    reports = [{'counters': {'site.edit_failed_adds': 1}}, {'counters': {'open.lookup_errors': 2}}, {'counters': {'site.edit_failed_adds': 0}}]
+    assert _serve(replay_options, reports) == [(2, False), (2, False), (2, False)]
+    assert RunState(replay_options['state_path']).watermark > watermark
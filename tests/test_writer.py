@@ -0,0 +1,92 @@
+from ocgis.replay import FakeFeature, FakeFeatureLayer
+from ocgis.writer import EditWriter
+
+
+class RollbackLayer(FakeFeatureLayer):
+    """Rejects features named 'bad' and, like ArcGIS by default, rolls back their whole batch."""
+
+    def edit_features(self, adds=None, updates=None, deletes=None, rollback_on_failure=True, **kwargs):
+        bad = [feature.attributes.get('name') == 'bad' for feature in adds or []]
+        if any(bad) and rollback_on_failure:
+            self.edit_count += 1
+            return {'addResults': [{'success': False} for _ in adds], 'updateResults': [], 'deleteResults': []}
+        good = [feature for feature, is_bad in zip(adds or [], bad) if not is_bad]
+        response = super().edit_features(adds=good, updates=updates, deletes=deletes)
+        results = iter(response['addResults'])
+        response['addResults'] = [{'success': False} if is_bad else next(results) for is_bad in bad]
+        return response
+
+
+class FlakyLayer(FakeFeatureLayer):
+    """Fails the first request, after committing it when `commit` is set, like a request timing out on its way back."""
+
+    def __init__(self, *args, commit: bool = True, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.commit = commit
+
+    def edit_features(self, **kwargs):
+        if self.edit_count == 0 and not self.commit:
+            self.edit_count += 1
+            raise ConnectionRefusedError('Connection refused.')
+        response = super().edit_features(**kwargs)
+        if self.edit_count == 1:
+            raise TimeoutError('Read timed out.')
+        return response
+
+
+class UnqueryableLayer(FlakyLayer):
+    def query(self, *args, **kwargs):
+        raise TimeoutError('Read timed out.')
+
+
+def _features(names):
+    return [FakeFeature(None, {'name': name, 'ticketNumber': str(number)}) for number, name in enumerate(names)]
+
+
+def test_only_failed_features_fail():
+    layer = RollbackLayer()
+    summary = EditWriter(layer, max_retries=3, backoff=0).write(adds=_features(['good'] * 9 + ['bad']))
+    assert summary.as_dict()['adds'] == 9
+    assert summary.as_dict()['failed_adds'] == 1
+    assert len(layer.features) == 9
+
+
+def test_committed_adds_are_not_resent_after_a_transport_error():
+    layer = FlakyLayer()
+    summary = EditWriter(layer, max_retries=3, backoff=0).write(adds=_features(['a', 'b']), updates=[])
+    assert len(layer.features) == 2
+    assert layer.edit_count == 1
+    assert summary.as_dict()['adds'] == 2
+    assert [result['objectId'] for result in summary.add_results] == [1, 2]
+
+
+def test_uncommitted_adds_are_resent_after_a_transport_error():
+    layer = FlakyLayer(commit=False)
+    summary = EditWriter(layer, max_retries=3, backoff=0).write(adds=_features(['a', 'b']))
+    assert len(layer.features) == 2
+    assert summary.as_dict()['adds'] == 2
+    assert summary.retries == 1
+
+
+def test_adds_are_not_resent_when_they_cannot_be_looked_up():
+    layer = UnqueryableLayer(commit=False)
+    summary = EditWriter(layer, max_retries=3, backoff=0).write(adds=_features(['a', 'b']))
+    assert len(layer.features) == 0
+    assert layer.edit_count == 1
+    assert summary.as_dict()['failed_adds'] == 2
+
+
+def test_updates_are_retried_after_a_transport_error():
+    layer = FlakyLayer([{'attributes': {'name': 'a'}, 'geometry': None}])
+    update = FakeFeature(None, {'OBJECTID': 1, 'name': 'renamed'})
+    summary = EditWriter(layer, max_retries=3, backoff=0).write(updates=[update])
+    assert summary.as_dict()['updates'] == 1
+    assert summary.retries == 1
+    assert layer.features[1].attributes['name'] == 'renamed'
+
+
+def test_batches_respect_max_features():
+    layer = FakeFeatureLayer()
+    summary = EditWriter(layer, max_features=4).write(adds=_features('abcdefghij'))
+    assert summary.batches == 3
+    assert layer.edit_count == 3